@@ -6,11 +6,15 @@ Dates utilities
 
 import datetime as dt
 
+import numpy as np
+
 from dateutil.relativedelta import relativedelta as _rl
 from pandas.tseries.offsets import to_datetime, WeekOfMonth
 
 today = to_datetime(dt.date.today())
 
+_MONTH_LENGTHS = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
 
 def imm_date(dates):
     """Returns IMM date: third Wednesday of March, June, September and December
@@ -40,6 +44,103 @@ def roll(dates, days=0, months=0, years=0, **kwargs):
         return dates.map(lambda date: date + rolling)
 
 
+def roll_months(dates, months, periods):
+    """Rolls the dates `periods` times by `months` months one step after the
+    other, as successive calls to `roll` would do: the day of month is
+    clipped to the end of the month and never goes back up afterwards.
+
+    Parameters
+    ==========
+        dates: list-like of datetimes
+            The starting dates
+
+        months: int
+            The number of months of each step
+
+        periods: int
+            The number of steps
+
+    Returns
+    =======
+        numpy array of datetime64[D] of shape (len(dates), periods + 1), the
+        column k containing the dates rolled k times
+    """
+    dates = as_date(dates).values.astype('datetime64[D]')
+    size = len(dates)
+    path, days, _, _ = walk_months(*split_months(dates),
+                                   np.full(size, months),
+                                   np.full(size, periods + 1))
+    days = join_months(path, days).astype('datetime64[D]')
+    return days.reshape(size, periods + 1)
+
+
+def split_months(dates):
+    """Returns the months since the epoch and the days of month of
+    datetime64[D] `dates`, with integer arithmetic on the proleptic
+    Gregorian calendar"""
+    days = np.asarray(dates).astype(np.int64) + 719468
+    era = days // 146097
+    day_of_era = days - era * 146097
+    year_of_era = (day_of_era - day_of_era // 1460 + day_of_era // 36524
+                   - day_of_era // 146096) // 365
+    day_of_year = day_of_era - (365 * year_of_era + year_of_era // 4
+                                - year_of_era // 100)
+    # Months and years start in March
+    month = (5 * day_of_year + 2) // 153
+    day = day_of_year - (153 * month + 2) // 5 + 1
+    months = (year_of_era + era * 400 - 1970) * 12 + month + 2
+    return months, day
+
+
+def join_months(months, days):
+    """Returns the days since the epoch of the `months` since the epoch and
+    the `days` of month, the inverse of `split_months`"""
+    # Months and years start in March
+    months = np.asarray(months, dtype=np.int64) + 1970 * 12 - 2
+    year, month = np.divmod(months, 12)
+    era = year // 400
+    year_of_era = year - era * 400
+    day_of_era = (year_of_era * 365 + year_of_era // 4 - year_of_era // 100
+                  + (153 * month + 2) // 5)
+    return era * 146097 + day_of_era - 719468 + days - 1
+
+
+def month_lengths(months):
+    """Returns the number of days of the `months` since the epoch"""
+    year, month = np.divmod(np.asarray(months, dtype=np.int64), 12)
+    year += 1970
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    return _MONTH_LENGTHS[month] + (leap & (month == 1))
+
+
+def roll_month_days(months, days, step):
+    """Rolls the months since the epoch and days of month once by `step`
+    months, the day being clipped to the end of month as `roll`"""
+    months = months + step
+    return months, np.minimum(days, month_lengths(months))
+
+
+def walk_months(months, days, steps, counts):
+    """Rolls the months since the epoch and days of month by `steps` months
+    one step after the other, `counts` dates per row the first one included,
+    as `roll_months` with a number of periods per row
+
+    Returns
+    =======
+        The flat months and days of month of the dates, the row and the
+        number of steps of each date
+    """
+    ids = np.repeat(np.arange(len(months)), counts)
+    starts = np.cumsum(counts) - counts
+    k = np.arange(len(ids)) - starts[ids]
+    path = months[ids] + steps[ids] * k
+    clips = np.where(k == 0, days[ids], month_lengths(path))
+    # Segmented running minimum: the rows are shifted below each other
+    shift = 32 * ids
+    clips = np.minimum.accumulate(clips - shift) + shift
+    return path, clips, ids, k
+
+
 def eom(date):
     """Returns the end of month of a date"""
     next_month = date + dt.timedelta(days=28)
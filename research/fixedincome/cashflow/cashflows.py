@@ -4,13 +4,23 @@ Bond Cash flow manager module
 
 import logging
 
+from collections import namedtuple
 
 from dateutil.relativedelta import relativedelta as _rl
 
+import numpy as np
+
 from ..utils import adjust_coupon_days
 
 LOGGER = logging.getLogger(__name__)
 
+# Future cash flows of a set of bonds in flat arrays: the time from the
+# settlement in years, the amount and the position of the bond of each cash
+# flow, and the accrued interest of each bond with a negative sign, paid at
+# the settlement
+PackedAmounts = namedtuple('PackedAmounts',
+                           ['times', 'amounts', 'bond_ids', 'accrued'])
+
 
 class CashFlows:
     """A class representing a stream of cash flows of a bond.
@@ -238,3 +248,26 @@ class CashFlows:
         variable_accrued += self._fraction(cfa, rolled, lc, date, rolled)
         df_cash_flows.iloc[0, 0] = variable_accrued + fixed_accrued
 
+
+def pack_amounts(bonds):
+    """Packs the cash flow amounts of `bonds` into `PackedAmounts`
+
+    The first row of `CashFlows.amounts` is the accrued interest paid at the
+    settlement, with a negative sign. The times of the following cash flows
+    are their year fractions in coupon periods divided by the coupon
+    frequency.
+    """
+    times, amounts, bond_ids, accrued = [], [], [], []
+    for i, bond in enumerate(bonds):
+        df_cash_flows = bond.cash_flows.amounts()
+        values = df_cash_flows.values.astype(np.float64)
+        frequency = bond.schedule.coupon_frequency
+        accrued.append(values[0, 0])
+        amounts.append(values[1:, 0])
+        times.append(values[1:, 1] / frequency)
+        bond_ids.append(np.full(len(values) - 1, i))
+
+    return PackedAmounts(np.concatenate(times),
+                         np.concatenate(amounts),
+                         np.concatenate(bond_ids),
+                         np.asarray(accrued))
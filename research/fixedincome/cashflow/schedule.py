@@ -55,6 +55,10 @@ class Schedule:
 
         self.time_step = int(12 / coupon_frequency)
 
+        # The quasi coupon dates are generated once and regenerated after a
+        # change of the dates they depend on
+        self._quasi_dates = None
+
     @property
     def settlement(self):
         return self._settlement
@@ -66,6 +70,7 @@ class Schedule:
     @settlement.setter
     def settlement(self, date):
         self._settlement = pd.to_datetime(date)
+        self._quasi_dates = None
 
     @property
     def maturity(self):
@@ -74,6 +79,7 @@ class Schedule:
     @maturity.setter
     def maturity(self, date):
         self._maturity = pd.to_datetime(date)
+        self._quasi_dates = None
 
     @property
     def issue(self):
@@ -82,6 +88,7 @@ class Schedule:
     @issue.setter
     def issue(self, date):
         self._issue = pd.to_datetime(date)
+        self._quasi_dates = None
 
     @property
     def first_coupon(self):
@@ -90,6 +97,7 @@ class Schedule:
     @first_coupon.setter
     def first_coupon(self, date):
         self._first_coupon = pd.to_datetime(date)
+        self._quasi_dates = None
 
     @property
     def last_coupon(self):
@@ -98,13 +106,12 @@ class Schedule:
     @last_coupon.setter
     def last_coupon(self, date):
         self._last_coupon = pd.to_datetime(date)
+        self._quasi_dates = None
 
     def quasi_coupon_dates(self):
-        dates = self._all_quasi_dates()
-        if self._settlement > dates[-1]:
-            return []
-        idx = next(i for i, x in enumerate(dates) if x >= self._settlement)
-        return dates[idx:]
+        dates = self.quasi_dates()
+        idx = np.searchsorted(dates, np.datetime64(self._settlement), 'left')
+        return list(pd.DatetimeIndex(dates[idx:]))
 
     def coupon_dates(self):
         dates = self.quasi_coupon_dates()
@@ -125,24 +132,37 @@ class Schedule:
         return sorted(dates)
 
     def quasi_issue_date(self):
-        return self._all_quasi_dates()[0]
+        return pd.Timestamp(self.quasi_dates()[0])
 
     def previous_quasi_coupon(self):
-        dates = self._all_quasi_dates()
-        idx = next(i for i, x in enumerate(dates) if x > self._settlement)
-        return dates[idx - 1]
+        return pd.Timestamp(self.quasi_dates()[self._next_quasi_index() - 1])
 
     def next_quasi_coupon(self):
-        dates = self._all_quasi_dates()
-        idx = next(i for i, x in enumerate(dates) if x > self._settlement)
-        return dates[idx]
+        return pd.Timestamp(self.quasi_dates()[self._next_quasi_index()])
 
     def last_quasi_coupon(self):
-        dates = self._all_quasi_dates()
+        dates = self.quasi_dates()
         if len(dates) >= 2:  # there is still quasi coupons
-            return dates[-2]
+            return pd.Timestamp(dates[-2])
         else:  # return the last one = maturity
-            return dates[-1]
+            return pd.Timestamp(dates[-1])
+
+    def quasi_dates(self):
+        """Returns the sorted quasi coupon dates as a datetime64 array,
+        shared between calls and not to be modified"""
+        if self._quasi_dates is None:
+            dates = pd.DatetimeIndex(self._all_quasi_dates())
+            self._quasi_dates = dates.values.astype('datetime64[ns]')
+        return self._quasi_dates
+
+    def _next_quasi_index(self):
+        """Returns the position of the first quasi coupon after the
+        settlement"""
+        dates = self.quasi_dates()
+        idx = np.searchsorted(dates, np.datetime64(self._settlement), 'right')
+        if idx == len(dates):
+            raise ValueError('No quasi coupon after the settlement')
+        return idx
 
     def first_coupon_date(self):
         if self._first_coupon is not None:
@@ -188,8 +208,8 @@ class Schedule:
 
     def full_odd_last_count(self):
         if self._last_coupon is not None:
-            dates = np.asarray(self._all_quasi_dates())
-            return np.sum(dates > self._last_coupon) - 1
+            dates = self.quasi_dates()
+            return np.sum(dates > np.datetime64(self._last_coupon)) - 1
         return 0
 
     def _all_quasi_dates(self):
@@ -0,0 +1,669 @@
+"""
+Schedules and cash flows of a universe of bonds computed on columnar arrays.
+
+The quasi coupon dates and the coupon dates of all the bonds are generated
+at once with the rules of `Schedule`, with month arithmetic on integer
+arrays instead of date loops, and their amounts with the rules of
+`CashFlows`. The dates of the bonds are returned flat, the dates of the
+bond i being dates[offsets[i]:offsets[i + 1]].
+"""
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from research.dates.daycounter import Actual365A
+from research.dates.utils import (
+    join_months,
+    month_lengths,
+    roll_month_days,
+    split_months,
+    walk_months
+)
+
+from .cashflows import PackedAmounts
+
+FlatDates = namedtuple('FlatDates', ['offsets', 'dates'])
+
+# Cash flows of a universe of bonds: the amounts and the year fractions of
+# the coupon dates of each bond, flat as `FlatDates`, and the accrued
+# interest of each bond
+FlatAmounts = namedtuple('FlatAmounts', ['offsets', 'dates', 'amounts',
+                                         'fractions', 'accrued'])
+
+
+class ScheduleUniverse:
+    """Creates the schedules of a universe of bonds
+
+    Parameters
+    ==========
+        settlement, maturity: list-like of dates
+            The settlement and maturity date of each bond
+
+        issue, first_coupon, last_coupon: list-like of dates, optional
+            The issue, odd first and odd last coupon dates of each bond,
+            missing dates being None or NaT
+
+        coupon_frequency: int or list-like of int
+            The number of coupons a year of each bond
+    """
+
+    def __init__(self,
+                 settlement,
+                 maturity,
+                 issue=None,
+                 first_coupon=None,
+                 last_coupon=None,
+                 coupon_frequency=2):
+
+        self.maturity = _as_days(maturity)
+        size = len(self.maturity)
+        self.settlement = _as_days(settlement, size)
+        self.issue = _as_days(issue, size)
+        self.first_coupon = _as_days(first_coupon, size)
+        self.last_coupon = _as_days(last_coupon, size)
+        self.coupon_frequency = np.broadcast_to(
+            np.asarray(coupon_frequency, dtype=np.int64), size
+        )
+
+        assert (self.settlement <= self.maturity).all()
+        has_issue = ~np.isnat(self.issue)
+        assert (self.issue[has_issue] <= self.settlement[has_issue]).all()
+        has_lc = ~np.isnat(self.last_coupon)
+        assert (self.last_coupon[has_lc] < self.maturity[has_lc]).all()
+        has_fc = ~np.isnat(self.first_coupon) & has_issue
+        assert (self.first_coupon[has_fc] > self.issue[has_fc]).all()
+
+        self.time_step = 12 // self.coupon_frequency
+        self.__quasi_dates = None
+        self.__coupon_dates = None
+
+    @classmethod
+    def from_schedules(cls, schedules):
+        """Creates the universe of the `Schedule` instances `schedules`"""
+        columns = ('settlement', 'maturity', 'issue', 'first_coupon',
+                   'last_coupon', 'coupon_frequency')
+        return cls(*(
+            [getattr(schedule, column) for schedule in schedules]
+            for column in columns
+        ))
+
+    def __len__(self):
+        return len(self.maturity)
+
+    def quasi_dates(self):
+        """Returns the sorted quasi coupon dates of each bond as
+        `FlatDates`, the same as `Schedule.quasi_dates`"""
+        if self.__quasi_dates is None:
+            self.__quasi_dates = self.__generate_quasi_dates()
+        return self.__quasi_dates
+
+    def coupon_dates(self):
+        """Returns the coupon dates of each bond as `FlatDates`, the same as
+        `Schedule.coupon_dates`"""
+        if self.__coupon_dates is None:
+            self.__coupon_dates = self.__select_coupon_dates()
+        return self.__coupon_dates
+
+    def quasi_issue_date(self):
+        """Returns the first quasi coupon date of each bond"""
+        offsets, dates = self.quasi_dates()
+        return dates[offsets[:-1]]
+
+    def previous_quasi_coupon(self):
+        """Returns the last quasi coupon date on or before the settlement of
+        each bond"""
+        offsets, dates = self.quasi_dates()
+        index = self.__next_quasi_index()
+        # As a list, the date before the first one is the last one
+        index = np.where(index == offsets[:-1], offsets[1:], index)
+        return dates[index - 1]
+
+    def next_quasi_coupon(self):
+        """Returns the first quasi coupon date after the settlement of each
+        bond"""
+        offsets, dates = self.quasi_dates()
+        return dates[self.__next_quasi_index()]
+
+    def last_quasi_coupon(self):
+        """Returns the quasi coupon date before the maturity of each bond"""
+        offsets, dates = self.quasi_dates()
+        return dates[np.maximum(offsets[1:] - 2, offsets[:-1])]
+
+    def __next_quasi_index(self):
+        offsets, dates = self.quasi_dates()
+        ids = _segment_ids(offsets)
+        after = dates > self.settlement[ids].astype(dates.dtype)
+        # Dates are sorted: the first date after the settlement follows the
+        # dates on or before it
+        index = offsets[:-1] + np.bincount(ids, ~after, len(self)).astype(
+            np.int64)
+        if (index >= offsets[1:]).any():
+            raise ValueError('No quasi coupon after the settlement')
+        return index
+
+    def __generate_quasi_dates(self):
+        step = self.time_step
+        settlement = self.settlement.astype(np.int64)
+        maturity = self.maturity.astype(np.int64)
+        has_issue = ~np.isnat(self.issue)
+        has_fc = ~np.isnat(self.first_coupon)
+        has_lc = ~np.isnat(self.last_coupon) & ~has_fc
+        regular = ~has_fc & ~has_lc
+        bound = np.where(has_issue, self.issue.astype(np.int64), settlement)
+
+        ids, months, days = [], [], []
+
+        # Odd first coupon: back from the first coupon to the quasi issue
+        # date, then forward until the maturity
+        if has_fc.any():
+            rows = np.flatnonzero(has_fc)
+            month, day = split_months(self.first_coupon[rows])
+            month, day, _ = _last_above(month, day, -step[rows],
+                                        bound[rows])
+            month, day, counts = _walk_below(month, day, step[rows],
+                                             maturity[rows])
+            ids.append(np.repeat(rows, counts))
+            months.append(month)
+            days.append(day)
+
+        # Odd last coupon: forward from the last coupon to the maturity, then
+        # back to the quasi issue date
+        if has_lc.any():
+            rows = np.flatnonzero(has_lc)
+            month, day = split_months(self.last_coupon[rows])
+            month, day = _first_above(month, day, step[rows], maturity[rows])
+            beyond = join_months(month, day) > maturity[rows]
+            back_month, back_day = roll_month_days(month, day, -step[rows])
+            month = np.where(beyond, back_month, month)
+            day = np.where(beyond, back_day, day)
+            month, day, counts = _walk_above(month, day, -step[rows],
+                                             bound[rows])
+            ids.append(np.repeat(rows, counts))
+            months.append(month)
+            days.append(day)
+
+        # Regular bonds: back from the maturity to the quasi issue date
+        if regular.any():
+            rows = np.flatnonzero(regular)
+            month, day = split_months(self.maturity[rows])
+            month, day, counts = _walk_above(month, day, -step[rows],
+                                             bound[rows])
+            ids.append(np.repeat(rows, counts))
+            months.append(month)
+            days.append(day)
+
+        ids = np.concatenate(ids)
+        reference = np.where(
+            has_fc,
+            self.first_coupon,
+            np.where(has_lc, self.last_coupon, self.maturity)
+        )
+        dates = _adjust_coupon_days(np.concatenate(months),
+                                    np.concatenate(days),
+                                    reference[ids])
+
+        # The maturity closes the dates generated from an odd coupon
+        odd = np.flatnonzero(~regular)
+        ids = np.concatenate([ids, odd])
+        dates = np.concatenate([dates, maturity[odd]])
+
+        # Sorts by bond then date on a single key, dates fitting in 32 bits
+        order = np.argsort((ids << 32) + (dates + 2 ** 31), kind='stable')
+        return _flat(ids[order], dates[order], len(self))
+
+    def __select_coupon_dates(self):
+        offsets, dates = self.quasi_dates()
+        ids = _segment_ids(offsets)
+        days = dates.astype('datetime64[D]').astype(np.int64)
+
+        # Quasi coupon dates from the settlement
+        keep = days >= self.settlement.astype(np.int64)[ids]
+        ids, days = ids[keep], days[keep]
+        positions = np.arange(len(ids))
+
+        # An odd first coupon not yet paid starts the coupon dates, none are
+        # left if it is not a quasi coupon date
+        first_coupon = self.first_coupon.astype(np.int64)
+        trimmed = (~np.isnat(self.first_coupon)
+                   & (self.settlement < self.first_coupon))[ids]
+        start = np.full(len(self), len(ids))
+        found = trimmed & (days == first_coupon[ids])
+        np.minimum.at(start, ids[found], positions[found])
+        keep = ~trimmed | (positions >= start[ids])
+        ids, days = ids[keep], days[keep]
+
+        # Dates after an odd last coupon are dropped but the last one
+        last = np.append(ids[1:] != ids[:-1], True)
+        has_lc = ~np.isnat(self.last_coupon)[ids]
+        last_coupon = self.last_coupon.astype(np.int64)[ids]
+        keep = ~has_lc | last | (days <= last_coupon)
+        return _flat(ids[keep], days[keep], len(self))
+
+
+class CashFlowUniverse:
+    """Creates the cash flows of a universe of bonds
+
+    The accrued interest, the coupon amounts and their year fractions are
+    computed for all the bonds at once with the rules of `CashFlows`, the
+    regular, odd first and odd last coupon bonds following masked paths.
+
+    Parameters
+    ==========
+        schedules: ScheduleUniverse
+            The schedules of the bonds
+
+        coupon: float or list-like of float
+            The coupon rate of each bond
+
+        face_value: float or list-like of float
+            The face value of each bond
+
+        day_counter: fdates.daycounter class or list-like of classes
+            The day count convention of each bond : default (Act/365A)
+    """
+
+    def __init__(self, schedules, coupon=0, face_value=100,
+                 day_counter=Actual365A):
+        self.schedules = schedules
+        size = len(schedules)
+        self.coupon_rate = np.broadcast_to(
+            np.asarray(coupon, dtype=np.float64), size)
+        self.face_value = np.broadcast_to(
+            np.asarray(face_value, dtype=np.float64), size)
+        if isinstance(day_counter, type):
+            day_counter = [day_counter] * size
+        self.day_counter = np.asarray(day_counter, dtype=object)
+        self.__amounts = None
+
+    @classmethod
+    def from_bonds(cls, bonds):
+        """Creates the cash flows of the `Bond` instances `bonds`"""
+        return cls(ScheduleUniverse.from_schedules(
+                       [bond.schedule for bond in bonds]),
+                   [bond.coupon_rate for bond in bonds],
+                   [bond.face_value for bond in bonds],
+                   [bond.schedule.day_counter for bond in bonds])
+
+    def __len__(self):
+        return len(self.schedules)
+
+    def regular_coupon_amount(self):
+        """Returns the regular coupon amount of each bond"""
+        return (self.face_value * self.coupon_rate
+                / self.schedules.coupon_frequency)
+
+    def amounts(self):
+        """Returns the accrued interest and the cash flows of each bond as
+        `FlatAmounts`, the same as the rows of `CashFlows.amounts`"""
+        if self.__amounts is None:
+            self.__amounts = self.__compute_amounts()
+        return self.__amounts
+
+    def pack(self):
+        """Returns the future cash flows as `PackedAmounts`, the same as
+        `pack_amounts` on the bonds"""
+        amounts = self.amounts()
+        ids = _segment_ids(amounts.offsets)
+        return PackedAmounts(
+            amounts.fractions / self.schedules.coupon_frequency[ids],
+            amounts.amounts,
+            ids,
+            amounts.accrued
+        )
+
+    def __compute_amounts(self):
+        schedules = self.schedules
+        step = schedules.time_step
+        offsets, dates = schedules.coupon_dates()
+        first, last = offsets[:-1], offsets[1:] - 1
+
+        stl = _days(schedules.settlement)
+        mat = _days(schedules.maturity)
+        issue = _days(schedules.issue)
+        fc = _days(schedules.first_coupon)
+        lc = _days(schedules.last_coupon)
+        has_issue = ~np.isnat(schedules.issue)
+        has_fc = ~np.isnat(schedules.first_coupon)
+        has_lc = ~np.isnat(schedules.last_coupon)
+
+        qid = _days(schedules.quasi_issue_date())
+        pcd = _days(schedules.previous_quasi_coupon())
+        ncd = _days(schedules.next_quasi_coupon())
+        flc = self.__full_odd_last_count()
+
+        # Dates adjusted only for the bonds of the case that needs them, an
+        # adjustment may be invalid for the others
+        def adjusted(rows, days, steps, reference):
+            values = np.zeros(len(self), dtype=np.int64)
+            values[rows] = _adjust(_roll_days(days[rows], steps[rows]),
+                                   reference[rows])
+            return values
+
+        fqd = adjusted(np.flatnonzero(has_fc | has_lc), qid, step, qid)
+        cfa = self.regular_coupon_amount()
+        fraction = self.__fraction
+
+        accrued = cfa.copy()
+        first_amount = np.full(len(self), np.nan)
+        last_amount = np.full(len(self), np.nan)
+
+        # Regular coupons
+        regular = ~has_fc & ~has_lc
+        at_coupon = regular & has_issue & (stl == pcd)
+        accrued[at_coupon] = 0
+        before = regular & has_issue & ~at_coupon & (
+            _roll_days(stl, -step) < issue)
+        rows = np.flatnonzero(before)
+        first_amount[rows] = fraction(rows, cfa, issue, ncd, pcd, ncd)
+        accrued[rows] = fraction(rows, first_amount, stl, issue, issue, ncd)
+        rows = np.flatnonzero(regular & ~at_coupon & ~before)
+        accrued[rows] = fraction(rows, cfa, stl, pcd, pcd, ncd)
+
+        # Odd first coupon, with or without an odd last coupon
+        before = has_fc & (stl < fc)
+        rows = np.flatnonzero(before & has_issue)
+        if len(rows):
+            first_amount[rows] = (
+                cfa[rows] * self.__full_odd_first_count(rows)
+                + fraction(rows, cfa, issue, fqd, qid, fqd)
+            )
+            # Full coupon periods between the issue and the settlement
+            count = _count_back(stl[rows], step[rows], issue[rows] - 1) - 1
+            accrued[rows] = (
+                fraction(rows, cfa, stl, pcd, pcd, ncd)
+                + fraction(rows, cfa, fqd, issue, qid, fqd)
+                + -count * cfa[rows]
+            )
+        rows = np.flatnonzero(before & ~has_issue)
+        accrued[rows] = fraction(rows, cfa, stl, qid, qid, fqd)
+        rows = np.flatnonzero(has_fc & ~before)
+        accrued[rows] = fraction(rows, cfa, stl, pcd, pcd, ncd)
+
+        rows = np.flatnonzero(has_fc)
+        lqc = _days(schedules.last_quasi_coupon())
+        last_amount[rows] = cfa[rows] * flc[rows] + fraction(
+            rows, cfa, lqc, mat, lqc, adjusted(rows, lqc, step, lqc)
+        )
+        after_last = has_fc & has_lc & (stl >= lc)
+
+        # Odd last coupon only
+        odd_last = has_lc & ~has_fc
+        regular_period = odd_last & (
+            has_issue & (fqd < stl) & (stl < lc) | ~has_issue & (stl < lc)
+        )
+        rows = np.flatnonzero(regular_period)
+        accrued[rows] = fraction(rows, cfa, stl, pcd, pcd, ncd)
+        at_coupon = odd_last & ~regular_period & (pcd == stl)
+        accrued[at_coupon] = 0
+        before = odd_last & ~regular_period & ~at_coupon & (stl < fqd) & (
+            fqd < lc)
+        rows = np.flatnonzero(before & ~has_issue)
+        accrued[rows] = fraction(rows, cfa, stl, qid, qid, fqd)
+        rows = np.flatnonzero(before & has_issue)
+        first_amount[rows] = fraction(rows, cfa, issue, fqd, qid, fqd)
+        accrued[rows] = fraction(rows, first_amount, stl, issue, issue, fqd)
+
+        rows = np.flatnonzero(odd_last)
+        lqc = adjusted(rows, lc, step * flc, lc)
+        last_amount[rows] = cfa[rows] * flc[rows] + fraction(
+            rows, cfa, lqc, mat, lqc, adjusted(rows, lqc, step, lqc)
+        )
+        after_last |= odd_last & (stl > lc)
+
+        rows = np.flatnonzero(after_last)
+        accrued[rows] = self.__after_last_coupon_accrued(rows, cfa)
+
+        # The first coupon amount is overwritten by the last one when there
+        # is a single coupon, the face value is paid at maturity
+        ids = _segment_ids(offsets)
+        amounts = cfa[ids]
+        rows = np.flatnonzero(~np.isnan(first_amount))
+        amounts[first[rows]] = first_amount[rows]
+        rows = np.flatnonzero(~np.isnan(last_amount))
+        amounts[last[rows]] = last_amount[rows]
+        amounts[last] += self.face_value
+
+        return FlatAmounts(offsets, dates, amounts,
+                           self.__year_fractions(), accrued)
+
+    def __year_fractions(self):
+        """Same as `Schedule.dates_fraction` for the coupon dates"""
+        schedules = self.schedules
+        step = schedules.time_step
+        offsets, dates = schedules.coupon_dates()
+        ids = _segment_ids(offsets)
+        stl = _days(schedules.settlement)
+        pcd = _days(schedules.previous_quasi_coupon())
+        ncd = _days(schedules.next_quasi_coupon())
+
+        counters = self.day_counter
+        ratio = _ratio(counters, stl, _days(dates[offsets[:-1]]), pcd, ncd)
+        fractions = (np.arange(len(ids)) - offsets[ids]) + ratio[ids]
+
+        # The last fraction is computed rolling back from the maturity
+        mat = _days(schedules.maturity)
+        month, day = split_months(mat)
+        month, day, count = _last_above(month, day, -step, stl)
+        rolled = _adjust(join_months(*roll_month_days(month, day, step)), mat)
+        date = _adjust(join_months(month, day), mat)
+        fractions[offsets[1:] - 1] = (
+            count - 1 + _ratio(counters, stl, rolled, date, rolled)
+        )
+        return fractions
+
+    def __full_odd_first_count(self, rows):
+        """Same as `Schedule.full_odd_first_count` for bonds with an issue
+        date and an odd first coupon"""
+        schedules = self.schedules
+        step = schedules.time_step[rows]
+        fc = _days(schedules.first_coupon[rows])
+        issue = _days(schedules.issue[rows])
+        count = _count_back(fc, step, issue) - 1
+        return np.where(_roll_days(fc, -step) < issue, 0, count)
+
+    def __full_odd_last_count(self):
+        """Same as `Schedule.full_odd_last_count`"""
+        schedules = self.schedules
+        offsets, dates = schedules.quasi_dates()
+        ids = _segment_ids(offsets)
+        lc = schedules.last_coupon.astype(dates.dtype)
+        after = np.bincount(ids, dates > lc[ids], len(self)).astype(np.int64)
+        return np.where(np.isnat(lc), 0, after - 1)
+
+    def __after_last_coupon_accrued(self, rows, cfa):
+        """Same as `CashFlows._handle_after_last_coupon_accrued`"""
+        schedules = self.schedules
+        step = schedules.time_step[rows]
+        stl = _days(schedules.settlement[rows])
+        lc = _days(schedules.last_coupon[rows])
+        mat = _days(schedules.maturity[rows])
+        cfa = cfa[rows]
+        counters = self.day_counter[rows]
+
+        # Back from the maturity to the quasi coupon before the settlement
+        month, day, _ = _last_above(*split_months(mat), -step, stl - 1)
+        date = _adjust(join_months(month, day), mat)
+        rolled = _adjust(join_months(*roll_month_days(month, day, step)), mat)
+        accrued = cfa * _ratio(counters, stl, date, date, rolled)
+
+        # Then back to the quasi coupon before the last coupon
+        month, day, count = _last_above(*split_months(date), -step, lc - 1)
+        date = _adjust(join_months(month, day), mat)
+        rolled = _adjust(join_months(*roll_month_days(month, day, step)), mat)
+        accrued += cfa * _ratio(counters, rolled, lc, date, rolled)
+        return accrued + -cfa * (count - 1)
+
+    def __fraction(self, rows, cash, start, end, period_start, period_end):
+        """Same as `CashFlows._fraction` for the bonds `rows`"""
+        return cash[rows] * _ratio(self.day_counter[rows], start[rows],
+                                   end[rows], period_start[rows],
+                                   period_end[rows])
+
+
+def flatten_amounts(frames):
+    """Returns the CASH_FLOW_MATRIX DataFrames of `CashFlows.amounts`, one
+    per bond, as `FlatAmounts`"""
+    values = [frame.values.astype(np.float64) for frame in frames]
+    counts = [len(value) - 1 for value in values]
+    return FlatAmounts(
+        np.concatenate([[0], np.cumsum(counts)]).astype(np.int64),
+        np.concatenate([
+            frame.index.values[1:].astype('datetime64[ns]')
+            for frame in frames
+        ]),
+        np.concatenate([value[1:, 0] for value in values]),
+        np.concatenate([value[1:, 1] for value in values]),
+        np.array([value[0, 0] for value in values])
+    )
+
+
+def _as_days(dates, size=None):
+    """Converts `dates` to a datetime64[D] array, None giving NaT"""
+    if dates is None:
+        return np.full(size, np.datetime64('NaT'), dtype='datetime64[D]')
+    if np.ndim(dates) == 0:
+        date = pd.Timestamp(dates).to_datetime64().astype('datetime64[D]')
+        return np.full(size, date)
+    dates = pd.to_datetime(pd.Series(list(dates), dtype=object))
+    return dates.values.astype('datetime64[D]')
+
+
+def _days(dates):
+    """Returns the days since the epoch of datetime64 `dates`"""
+    return np.asarray(dates).astype('datetime64[D]').astype(np.int64)
+
+
+def _day_count(day_counter, start, end):
+    """Returns the number of days between the days since the epoch `start`
+    and `end` with `day_counter`"""
+    start = pd.DatetimeIndex(start.astype('datetime64[D]'))
+    end = pd.DatetimeIndex(end.astype('datetime64[D]'))
+    return np.asarray(day_counter(start, end).days().days, dtype=np.float64)
+
+
+def _ratio(day_counters, start, end, period_start, period_end):
+    """Returns the days between `start` and `end` over the days between
+    `period_start` and `period_end`, counted with the day counter of each
+    date"""
+    days = np.empty(len(start))
+    period = np.empty(len(start))
+    for day_counter in set(day_counters):
+        mask = day_counters == day_counter
+        days[mask] = _day_count(day_counter, start[mask], end[mask])
+        period[mask] = _day_count(day_counter, period_start[mask],
+                                  period_end[mask])
+    return days / period
+
+
+def _roll_days(days, steps):
+    """Rolls the days since the epoch once by `steps` months"""
+    return join_months(*roll_month_days(*split_months(days), steps))
+
+
+def _adjust(days, reference):
+    """Same as `adjust_coupon_days` on days since the epoch"""
+    months, day = split_months(days)
+    return _adjust_coupon_days(months, day,
+                               np.asarray(reference).astype('datetime64[D]'))
+
+
+def _count_back(days, steps, bound):
+    """Returns the number of dates after `bound` rolling back the days
+    since the epoch one step after the other"""
+    return _last_above(*split_months(days), -steps, bound)[2]
+
+
+def _segment_ids(offsets):
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _flat(ids, days, size):
+    """Returns the sorted `days` of each id as `FlatDates`"""
+    counts = np.bincount(ids, minlength=size)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    dates = days.astype('datetime64[D]').astype('datetime64[ns]')
+    return FlatDates(offsets, dates)
+
+
+def _walk(months, days, steps, bound):
+    """Rolls each date by `steps` months one step after the other, as
+    successive `relativedelta` additions, until it passes the days `bound`:
+    the day of month is clipped to the end of month and never goes back up
+    afterwards. Returns the flat months, days and days since the epoch of
+    the dates, the row and the number of steps of each date."""
+    bound_months, _ = split_months(bound)
+    distance = np.abs(months - bound_months)
+    counts = distance // np.abs(steps) + 3
+    path, clips, ids, k = walk_months(months, days, steps, counts)
+    return path, clips, join_months(path, clips), ids, k
+
+
+def _walk_above(months, days, steps, bound):
+    """Rolls back the dates while they are after `bound`, returns the flat
+    months and days of the dates after `bound` and of the first one on or
+    before it, and the number of dates of each row"""
+    path, clips, dates, ids, k = _walk(months, days, steps, bound)
+    counts = np.bincount(ids, dates > bound[ids], len(months)).astype(
+        np.int64)
+    keep = k <= counts[ids]
+    return path[keep], clips[keep], counts + 1
+
+
+def _walk_below(months, days, steps, bound):
+    """Rolls the dates while they are before `bound`, returns the flat months
+    and days of the dates before `bound` and the number of dates of each
+    row"""
+    path, clips, dates, ids, _ = _walk(months, days, steps, bound)
+    below = dates < bound[ids]
+    counts = np.bincount(ids, below, len(months)).astype(np.int64)
+    return path[below], clips[below], counts
+
+
+def _last_above(months, days, steps, bound):
+    """Returns the first date on or before `bound` rolling back by `steps`
+    months, the date itself if already on or before it, and the number of
+    steps"""
+    path, clips, dates, ids, k = _walk(months, days, steps, bound)
+    counts = np.bincount(ids, dates > bound[ids], len(months)).astype(
+        np.int64)
+    found = k == counts[ids]
+    return path[found], clips[found], counts
+
+
+def _first_above(months, days, steps, bound):
+    """Returns the first date on or after `bound` rolling forward by `steps`
+    months, the date itself if already on or after it"""
+    path, clips, dates, ids, k = _walk(months, days, steps, bound)
+    counts = np.bincount(ids, dates < bound[ids], len(months))
+    found = k == counts[ids]
+    return path[found], clips[found]
+
+
+def _end_of_month(days):
+    """Same as `research.dates.utils.eom` on days since the epoch: the day
+    before the first of the month of the date 28 days later"""
+    later = days + 28
+    _, day = split_months(later)
+    return later - day
+
+
+def _adjust_coupon_days(months, days, reference):
+    """Same as `adjust_coupon_days` on the flat dates with the reference
+    date of each date, returns the days since the epoch"""
+    dates = join_months(months, days)
+    ref_month, ref_day = split_months(reference)
+    next_month, _ = split_months(reference + 1)
+    # December is not an end of month for `is_eom`
+    is_eom = (next_month == ref_month + 1) & (ref_month % 12 != 11)
+
+    eom_days = _end_of_month(dates)
+    _, eom_day = split_months(eom_days)
+    february = months % 12 == 1
+    day = np.where((ref_day > 28) & february, eom_day, ref_day)
+
+    valid = is_eom | (day <= month_lengths(months))
+    if not valid.all():
+        raise ValueError('day is out of range for month')
+    return np.where(is_eom, eom_days, join_months(months, day))
@@ -4,18 +4,47 @@ Yield Curve implementation for various term structures
 
 
 from abc import ABCMeta, abstractmethod
+from collections import OrderedDict, namedtuple
+
+import numpy as np
+import pandas as pd
+
+from scipy import sparse
+
+from .interpolation import Interpolator
+
+CacheInfo = namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
 
 
 class Curve:
-    """Generic cuve abstract calss"""
+    """Generic cuve abstract calss
+
+    The results of `get` are kept in a bounded LRU cache keyed by the query
+    dates, cleared whenever the term structure changes. Cached results are
+    shared between calls and should not be modified.
+    """
     __metaclass__ = ABCMeta
 
+    cache_size = 256
+
     def __init__(self, curve_type, df_rates, spot_date, daycounter):
 
-        self._data = df_rates
+        self.__cache = OrderedDict()
+        self.__hits = 0
+        self.__misses = 0
         self.spot_date = spot_date
         self.curve_type = curve_type
         self.daycounter = daycounter
+        self._data = df_rates
+
+    @property
+    def _data(self):
+        return self.__data
+
+    @_data.setter
+    def _data(self, df_rates):
+        self.__data = df_rates
+        self._invalidate()
 
     @property
     def term_structure(self):
@@ -32,7 +61,46 @@ class Curve:
             maturities: List like of datetime
                 The new maturities to be added for interpolation
         """
-        return self._data.loc[maturities]
+        key = _query_key(maturities)
+        try:
+            return self._cached(key)
+        except KeyError:
+            return self._store(key, self._data.loc[maturities])
+
+    def cache_info(self):
+        """Returns the hits, misses, maximum and current size of the query
+        cache"""
+        return CacheInfo(self.__hits,
+                         self.__misses,
+                         self.cache_size,
+                         len(self.__cache))
+
+    def cache_clear(self):
+        """Clears the query cache and its statistics"""
+        self.__cache.clear()
+        self.__hits = self.__misses = 0
+
+    def _invalidate(self):
+        """Clears the cached queries after a change of the term structure"""
+        self.__cache.clear()
+
+    def _cached(self, key):
+        """Returns the cached value of `key`, raises a KeyError on miss"""
+        try:
+            value = self.__cache[key]
+        except KeyError:
+            self.__misses += 1
+            raise
+        self.__cache.move_to_end(key)
+        self.__hits += 1
+        return value
+
+    def _store(self, key, value):
+        """Caches `value` under `key`, evicting the least recently used"""
+        self.__cache[key] = value
+        if len(self.__cache) > self.cache_size:
+            self.__cache.popitem(last=False)
+        return value
 
     @abstractmethod
     def fit_terms(self, maturities):
@@ -47,6 +115,22 @@ class Curve:
         """
         raise NotImplementedError('Please implement in derived classes')
 
+    @abstractmethod
+    def evaluate(self, dates, kind='discount'):
+        """Returns the discount factors, zero coupon rates or forward rates
+        at `dates` without modifying the term structure
+
+        Parameters
+        ==========
+
+            dates: List like of datetime
+                The query dates
+
+            kind: str
+                One of ('discount', 'spot', 'forward')
+        """
+        raise NotImplementedError('Please implement in derived classes')
+
     def plot(self):
         """Plot the term structure"""
         terms = self._compute_terms()
@@ -109,12 +193,30 @@ class YieldCurve(Curve):
         curve = getattr(spot_curve.discounts, method_name)()
         self._data = curve.term_structure
 
-    def cashflows(self, dates):
-        """Build Cashflow matrix for each yield curve"""
-        return {
+    def evaluate(self, dates, kind='discount'):
+        """Evaluates the discount curve, see `DiscountCurve.evaluate`"""
+        return self._discounts.evaluate(dates, kind)
+
+    def cashflows(self, dates, dense=True):
+        """Build Cashflow matrix for each yield curve
+
+        Parameters
+        ==========
+
+            dates: List like of datetime
+                The maturities of the instruments
+
+            dense: Boolean
+                Whether to return DataFrames with the cashflow dates and the
+                prices in columns or `CashflowMatrix` instances
+        """
+        cashflows = {
             col: self._compute_cashflows(self._data[col], dates)
             for col in self._data.columns
         }
+        if dense:
+            return {col: cf.to_frame() for col, cf in cashflows.items()}
+        return cashflows
 
     def discount_factors(self):
         """Computes the discount factors
@@ -135,16 +237,63 @@ class YieldCurve(Curve):
 
     @abstractmethod
     def _compute_cashflows(self, series, dates):
-        """Build Cashflow matrix"""
+        """Build Cashflow matrix as a `CashflowMatrix`"""
         raise NotImplementedError('Please implement in derived classes')
 
 
+class CashflowMatrix:
+    """Sparse cashflow matrix of a set of instruments
+
+    Parameters
+    ==========
+
+        matrix: scipy sparse matrix (instruments x dates)
+            The cashflow of each instrument at each date
+
+        dates: pandas DatetimeIndex
+            The sorted cashflow dates
+
+        prices: numpy array
+            The price of each instrument
+    """
+
+    def __init__(self, matrix, dates, prices):
+        self.matrix = sparse.csr_matrix(matrix)
+        self.dates = pd.DatetimeIndex(dates)
+        self.prices = np.asarray(prices, dtype=np.float64)
+
+    @classmethod
+    def from_entries(cls, rows, dates, values, prices):
+        """Builds the matrix from the (instrument, date, value) entries"""
+        dates = pd.DatetimeIndex(dates)
+        columns = dates.unique().sort_values()
+        matrix = sparse.csr_matrix(
+            (values, (rows, columns.get_indexer(dates))),
+            shape=(len(prices), len(columns))
+        )
+        return cls(matrix, columns, prices)
+
+    @property
+    def shape(self):
+        """Returns the number of instruments and cashflow dates"""
+        return self.matrix.shape
+
+    def to_frame(self):
+        """Returns the dense DataFrame with the cashflow dates and the prices
+        in columns"""
+        df_cashflows = pd.DataFrame(self.matrix.toarray(), columns=self.dates)
+        df_cashflows['prices'] = self.prices
+        return df_cashflows
+
+
+def _query_key(maturities):
+    """Returns a hashable key of the query dates"""
+    if np.ndim(maturities) == 0:
+        return pd.Timestamp(maturities)
+    return tuple(pd.DatetimeIndex(maturities).asi8)
+
+
 def _interpolate(df_rates, spot_date, daycounter):
     """Interpolate the missing values of a yield curve"""
-    index = df_rates.index
-    terms = daycounter(spot_date, df_rates.index).fraction()
-    df_rates.index = terms
-    df_rates.interpolate(method='index',
-                         limit_direction='both',
-                         inplace=True)
-    df_rates.index = index
+    filled = Interpolator(df_rates, spot_date, daycounter).fill()
+    df_rates.iloc[:, :] = filled.values
@@ -0,0 +1,215 @@
+"""
+Array backed storage of the pillars of a term structure
+"""
+
+import numpy as np
+import pandas as pd
+
+
+def _as_dates(dates):
+    """Converts `dates` to a sorted array of unique datetime64[ns]"""
+    dates = pd.DatetimeIndex(np.atleast_1d(dates)).values
+    return np.unique(dates.astype('datetime64[ns]'))
+
+
+def _fractions(spot_date, daycounter, dates):
+    """Returns the year fractions between `spot_date` and `dates`"""
+    if len(dates) == 0:
+        return np.empty(0)
+    fractions = daycounter(spot_date, pd.DatetimeIndex(dates)).fraction()
+    return np.asarray(fractions, dtype=np.float64)
+
+
+class _Pillars:
+    """Sorted pillars of a term structure stored as numpy arrays.
+
+    The pillars mimic a pandas DataFrame indexed by maturities: `values` has
+    one row per date and one column per curve, missing values being NaN.
+    Dates are kept sorted so that new pillars are inserted with a binary
+    search instead of re-sorting a DataFrame.
+
+    Parameters
+    ==========
+
+        dates: numpy array of datetime64[ns]
+            The sorted and unique maturities of the pillars
+
+        values: 2-D numpy array
+            The values of the pillars with dates in rows
+
+        columns: pandas Index
+            The name of each curve
+
+        spot_date: datetime
+            the evaluation date
+
+        daycounter: fdates.daycounter class
+            The day count convention used to compute the year fractions
+
+        terms: numpy array, optional
+            The year fractions of `dates`, computed if not given
+    """
+
+    def __init__(self, dates, values, columns, spot_date, daycounter,
+                 terms=None):
+        self.dates = dates
+        self.values = values
+        self.columns = columns
+        self.spot_date = spot_date
+        self.daycounter = daycounter
+        if terms is None:
+            terms = _fractions(spot_date, daycounter, dates)
+        self.terms = terms
+
+    @classmethod
+    def from_frame(cls, frame, spot_date, daycounter):
+        """Builds the pillars from a DataFrame with maturities as index"""
+        frame = frame.sort_index()
+        dates = frame.index.values.astype('datetime64[ns]')
+        values = frame.values.astype(np.float64)
+        if len(dates) != len(np.unique(dates)):
+            frame = frame.groupby(level=0).first()
+            dates = frame.index.values.astype('datetime64[ns]')
+            values = frame.values.astype(np.float64)
+        return cls(dates, values, frame.columns, spot_date, daycounter)
+
+    def __len__(self):
+        return len(self.dates)
+
+    @property
+    def index(self):
+        """Returns the maturities as a pandas DatetimeIndex"""
+        return pd.DatetimeIndex(self.dates)
+
+    def to_frame(self):
+        """Returns the pillars as a pandas DataFrame"""
+        return pd.DataFrame(self.values.copy(),
+                            index=self.index,
+                            columns=self.columns)
+
+    def like(self, values, dates=None, terms=None):
+        """Returns new pillars sharing the grid of the current ones"""
+        if dates is None:
+            dates, terms = self.dates, self.terms
+        return type(self)(dates, values, self.columns,
+                          self.spot_date, self.daycounter, terms)
+
+    def locate(self, dates):
+        """Returns the positions of `dates`, raises a KeyError if missing"""
+        dates = pd.DatetimeIndex(np.atleast_1d(dates)).values
+        dates = dates.astype('datetime64[ns]')
+        positions = np.searchsorted(self.dates, dates)
+        found = positions < len(self.dates)
+        found[found] = self.dates[positions[found]] == dates[found]
+        if not found.all():
+            raise KeyError(pd.DatetimeIndex(dates[~found]).tolist())
+        return positions
+
+    def rows(self, dates):
+        """Returns the values of the pillars at `dates`"""
+        return self.values[self.locate(dates)]
+
+    def row(self, date):
+        """Returns the values of the pillar at `date`"""
+        return self.values[self.locate(date)[0]]
+
+    def take(self, dates):
+        """Returns the values (dates x columns) and the year fractions at
+        `dates`, in any order, values being NaN for the missing pillars"""
+        dates = pd.DatetimeIndex(np.atleast_1d(dates)).values
+        dates = dates.astype('datetime64[ns]')
+        positions = np.searchsorted(self.dates, dates)
+        found = positions < len(self.dates)
+        found[found] = self.dates[positions[found]] == dates[found]
+
+        terms = np.empty(len(dates))
+        terms[found] = self.terms[positions[found]]
+        terms[~found] = _fractions(self.spot_date, self.daycounter,
+                                   dates[~found])
+        values = np.full((len(dates), len(self.columns)), np.nan)
+        values[found] = self.values[positions[found]]
+        return values, terms
+
+    def at(self, dates):
+        """Returns the values and the year fractions at `dates` as
+        `insert(dates).interpolate()` would, without modifying the pillars"""
+        values, terms = self.take(dates)
+        missing = np.isnan(self.values)
+        for i in np.flatnonzero(~missing.all(axis=0)):
+            query = np.isnan(values[:, i])
+            valid = ~missing[:, i]
+            values[query, i] = np.interp(terms[query],
+                                         self.terms[valid],
+                                         self.values[valid, i])
+        return values, terms
+
+    def combine_first(self, other):
+        """Same as pandas `combine_first`: values of the current pillars are
+        kept and missing values are filled with the ones of `other`
+        """
+        this = self
+        if not this.columns.equals(other.columns):
+            columns = this.columns.union(other.columns)
+            this, other = this.reindex_columns(columns), \
+                other.reindex_columns(columns)
+
+        dates = np.union1d(this.dates, other.dates)
+        this_pos = np.searchsorted(dates, this.dates)
+        other_pos = np.searchsorted(dates, other.dates)
+
+        terms = np.empty(len(dates))
+        terms[other_pos] = other.terms
+        terms[this_pos] = this.terms
+
+        values = np.full((len(dates), len(this.columns)), np.nan)
+        values[other_pos] = other.values
+        current = values[this_pos]
+        values[this_pos] = np.where(np.isnan(this.values),
+                                    current,
+                                    this.values)
+        return this.like(values, dates, terms)
+
+    def reindex_columns(self, columns):
+        """Returns the pillars with `columns`, missing ones filled with NaN"""
+        positions = self.columns.get_indexer(columns)
+        values = np.full((len(self.dates), len(columns)), np.nan)
+        values[:, positions >= 0] = self.values[:, positions[positions >= 0]]
+        return type(self)(self.dates, values, columns, self.spot_date,
+                          self.daycounter, self.terms)
+
+    def insert(self, dates):
+        """Returns the pillars with empty rows added for the new `dates`"""
+        dates = _as_dates(dates)
+        dates = dates[~np.isin(dates, self.dates)]
+        if len(dates) == 0:
+            return self
+        empty = np.full((len(dates), len(self.columns)), np.nan)
+        return self.combine_first(self.like(empty, dates, None))
+
+    def assign(self, date, values):
+        """Sets the values at `date`, inserting the pillar if needed"""
+        date = _as_dates(date)
+        position = np.searchsorted(self.dates, date[0])
+        if position < len(self.dates) and self.dates[position] == date[0]:
+            self.values[position] = values
+            return self
+        self.dates = np.insert(self.dates, position, date[0])
+        self.terms = np.insert(
+            self.terms,
+            position,
+            _fractions(self.spot_date, self.daycounter, date)[0]
+        )
+        self.values = np.insert(self.values, position, values, axis=0)
+        return self
+
+    def interpolate(self):
+        """Fills missing values by linear interpolation on year fractions.
+        Values outside the available range are extrapolated flat.
+        """
+        missing = np.isnan(self.values)
+        for i in np.flatnonzero(missing.any(axis=0) & ~missing.all(axis=0)):
+            valid = ~missing[:, i]
+            self.values[~valid, i] = np.interp(self.terms[~valid],
+                                               self.terms[valid],
+                                               self.values[valid, i])
+        return self
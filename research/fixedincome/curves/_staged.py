@@ -0,0 +1,77 @@
+"""
+Stage by stage construction of a discount curve from spot, futures and swap
+rates, keeping the curve built after each stage so that a change of the
+rates of a stage only rebootstraps that stage and the following ones.
+"""
+
+# pylint: disable=import-error
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from .api import DiscountCurve
+
+STAGES = ('spot', 'futures', 'swap')
+
+
+class _StagedCurve:
+    """Discount curve bootstrapped from spot rates, then futures rates and
+    then swap rates, each given as a single column DataFrame or Series, the
+    swaps with the `method` of `DiscountCurve.bootstrap_swaps`"""
+
+    def __init__(self, df_spots, df_futures, df_swaps, spot_date, daycounter,
+                 method='iterative'):
+        self.spot_date = spot_date
+        self.daycounter = daycounter
+        self.method = method
+
+        inputs = zip(STAGES, (df_spots, df_futures, df_swaps))
+        self.stages = [
+            (stage, _as_series(rates)) for stage, rates in inputs
+            if rates is not None
+        ]
+        self.pillars = pd.MultiIndex.from_tuples(
+            [(stage, date)
+             for stage, rates in self.stages for date in rates.index],
+            names=['stage', 'maturity']
+        )
+        # Base curve after each stage
+        self.snapshots = []
+        self.rebuild(0)
+
+    @property
+    def curve(self):
+        """The curve after the last stage, shared and not to be modified"""
+        return self.snapshots[-1]
+
+    def rebuild(self, start):
+        """Rebootstraps the stages from the `start`-th one"""
+        del self.snapshots[start:]
+        curve = None
+        if start > 0:
+            curve = copy.deepcopy(self.snapshots[start - 1])
+        for stage, rates in self.stages[start:]:
+            curve = self.apply(curve, stage, rates.to_frame(0))
+            self.snapshots.append(copy.deepcopy(curve))
+        return curve
+
+    def apply(self, curve, stage, df_rates):
+        """Applies the bootstrap of `stage` to `curve`, the spot stage
+        creates the curve"""
+        if stage == 'spot':
+            return DiscountCurve.from_spots(df_rates,
+                                            self.spot_date,
+                                            self.daycounter)
+        if stage == 'futures':
+            curve.bootstrap_futures(df_rates)
+        else:
+            curve.bootstrap_swaps(df_rates, method=self.method)
+        return curve
+
+
+def _as_series(rates):
+    if isinstance(rates, pd.DataFrame):
+        rates = rates.iloc[:, 0]
+    return rates.sort_index().astype(np.float64)
@@ -11,11 +11,27 @@ Yield curve api module implements the following Yield Curves:
 import numpy as np
 import pandas as pd
 
+from scipy import linalg, sparse
+
 from research.dates.daycounter import Actual360
 from research.dates.utils import today
 
-from ..utils import futures_resets, futures_reset, swap_cashflow_dates
-from ._generic import YieldCurve, Curve, _interpolate
+from ..utils import (
+    futures_resets,
+    futures_reset,
+    swap_cashflow_dates,
+    swap_cashflow_schedule
+)
+from ._generic import (
+    YieldCurve,
+    Curve,
+    CashflowMatrix,
+    _interpolate,
+    _query_key
+)
+from ._pillars import _Pillars
+
+KINDS = ('discount', 'spot', 'forward')
 
 
 def interpolate(df_rates, spot_date=today, daycounter=Actual360):
@@ -26,6 +42,9 @@ def interpolate(df_rates, spot_date=today, daycounter=Actual360):
 class DiscountCurve(Curve):
     """Creates an instance of a discount curve
 
+    The discount factors and the spot rates are stored as sorted numpy arrays
+    of pillars, the DataFrame of the term structure is only built when read.
+
     Parameters
     ==========
 
@@ -44,11 +63,70 @@ class DiscountCurve(Curve):
                  daycounter=Actual360):
 
         super().__init__('Discount', discounts, spot_date, daycounter)
-        self.__spots = self.__to_spots()
+        self.__spots = self.__to_spots(self.__discounts)
+
+    @property
+    def _data(self):
+        """The discount factors DataFrame, built from the pillars on demand"""
+        if self.__frame is None:
+            self.__frame = self.__discounts.to_frame()
+        return self.__frame
+
+    @_data.setter
+    def _data(self, discounts):
+        self.__update(_Pillars.from_frame(discounts,
+                                          self.spot_date,
+                                          self.daycounter))
 
     def fit_terms(self, maturities):
-        self.__fit_spots(maturities)
-        self.__fit_discounts()
+        key = ('fit_terms', _query_key(maturities))
+        try:
+            self._cached(key)
+        except KeyError:
+            self.__fit_spots(maturities)
+            self.__fit_discounts()
+            self._store(key, None)
+
+    def evaluate(self, dates, kind='discount'):
+        """Returns the discount factors, zero coupon rates or forward rates
+        at `dates` without adding them to the term structure
+
+        The values are the ones `fit_terms` would give: pillars are returned
+        as stored and the spot rates are interpolated linearly between them.
+        The forward rate of a date runs from the previous distinct date of
+        `dates` in chronological order, from the spot date for the earliest
+        one, as `to_forward` on the pillars. The results follow the order of
+        `dates`, duplicates included.
+
+        Parameters
+        ==========
+            dates: list like of datetime
+                The query dates
+
+            kind: str
+                One of ('discount', 'spot', 'forward')
+        """
+        assert kind in KINDS
+        dates = pd.DatetimeIndex(np.atleast_1d(dates))
+        # Evaluated on the sorted unique dates, mapped back to the query
+        unique, positions = np.unique(dates.values.astype('datetime64[ns]'),
+                                      return_inverse=True)
+        spots, terms = self.__spots.at(unique)
+        if kind == 'spot':
+            values = spots
+        else:
+            values, _ = self.__discounts.take(unique)
+            fitted = self.__discount(
+                self.__spots.like(spots, unique, terms)
+            ).values
+            values = np.where(np.isnan(values), fitted, values)
+        if kind == 'forward':
+            previous = np.vstack([np.ones((1, values.shape[1])), values[:-1]])
+            diff = np.diff(terms, prepend=0.)[:, np.newaxis]
+            values = (previous / values - 1) / diff
+        return pd.DataFrame(values[positions.ravel()],
+                            index=dates,
+                            columns=self.__spots.columns)
 
     @classmethod
     def from_spots(cls, df_spots, spot_date=today, daycounter=Actual360):
@@ -65,8 +143,13 @@ class DiscountCurve(Curve):
             daycounter: fdates.daycounter class
                 The day count convention to be used : default (Act/360)
         """
-        terms = daycounter(spot_date, df_spots.index).fraction()
-        rates = 1 / (1 + df_spots.mul(terms, axis=0))
+        terms = np.asarray(daycounter(spot_date, df_spots.index).fraction(),
+                           dtype=np.float64)
+        rates = pd.DataFrame(
+            _simple_discounts(terms[:, np.newaxis], df_spots.values),
+            index=df_spots.index,
+            columns=df_spots.columns
+        )
         return cls(rates, spot_date, daycounter)
 
     @classmethod
@@ -74,31 +157,85 @@ class DiscountCurve(Curve):
                             df_cashflows,
                             prices,
                             spot_date=today,
-                            daycounter=Actual360):
+                            daycounter=Actual360,
+                            dates=None):
         """Construct the discount curve using the pseudo inverse method
 
         Parameters
         ==========
             df_cashflows: pandas DataFrame with cashflow dates in columns with
-                          increasing order and instruments id in index
+                          increasing order and instruments id in index or
+                          scipy sparse matrix
                 The DataFrame containing the cashflows for each instrument
 
-            prices: list like
-                the price of each security.
+            prices: list like or 2-D array like
+                the price of each security. Each column of a 2-D input is
+                a set of prices fitted against the same cashflows and gives
+                a column of the discount curve.
 
             spot_date: datetime
                 the evaluation date
 
             daycounter: fdates.daycounter class
                 The day count convention to be used : default (Act/360)
+
+            dates: list like of datetime
+                The cashflow dates, required when `df_cashflows` is a sparse
+                matrix
         """
-        cash = df_cashflows.values
-        date = df_cashflows.columns
-        prices = np.asarray(prices)
+        if sparse.issparse(df_cashflows):
+            cash = df_cashflows.tocsr()
+            date = pd.DatetimeIndex(dates)
+        else:
+            cash = df_cashflows.values
+            date = df_cashflows.columns
+
+        if isinstance(prices, pd.DataFrame):
+            columns = prices.columns
+        elif np.ndim(prices) == 2:
+            columns = range(np.shape(prices)[1])
+        else:
+            columns = ['discount']
+
+        prices = np.asarray(prices, dtype=np.float64)
         terms = daycounter(spot_date, date).fraction().to_series()
         discounts = _invert(cash, terms, prices)
         return cls(
-            pd.DataFrame(discounts, index=date, columns=['discount']),
+            pd.DataFrame(discounts, index=date, columns=columns),
+            spot_date,
+            daycounter
+        )
+
+    @classmethod
+    def from_parametrization(cls,
+                             parametrization,
+                             maturities,
+                             spot_date=today,
+                             daycounter=Actual360):
+        """Construct the discount curve of a fitted parametric or non
+        parametric curve on `maturities`
+
+        Parameters
+        ==========
+            parametrization: Parametrization
+                The fitted curve, e.g. Svensson, SmoothingSpline or
+                MonotoneConvex, whose terms are year fractions of `daycounter`
+
+            maturities: list like of datetime
+                The maturities of the pillars
+
+            spot_date: datetime
+                the evaluation date
+
+            daycounter: fdates.daycounter class
+                The day count convention to be used : default (Act/360)
+        """
+        maturities = pd.DatetimeIndex(maturities)
+        terms = np.asarray(daycounter(spot_date, maturities).fraction(),
+                           dtype=np.float64)
+        discounts = parametrization.discount_curve(terms)
+        return cls(
+            pd.DataFrame({'discount': discounts}, index=maturities),
             spot_date,
             daycounter
         )
@@ -111,37 +248,56 @@ class DiscountCurve(Curve):
             df_spots: pandas DataFrame with maturities in index as datetime
                 the DataFrame containing the futures rates
         """
-        long, short = self.__discount(df_spots)
-
-        if not short.empty:
-            self._data = self._data.combine_first(short)
-
-        if not long.empty:
-            self._data = self._data.combine_first(long)
-
-        self.__spots = df_spots.combine_first(self.__spots)
+        spots = _Pillars.from_frame(df_spots, self.spot_date, self.daycounter)
+        self.__update(self.__discounts.combine_first(self.__discount(spots)))
+        self.__spots = spots.combine_first(self.__spots)
 
     def bootstrap_futures(self, df_futures):
         """Bootstrap discount factors from futures rates
 
+        The futures are sorted by maturity. A contract resetting at the
+        maturity of the previous one extends its chain of forward discount
+        factors, computed with a cumulative product. The discount factors of
+        the intermediate reset dates are interpolated once at the end.
+
         Parameters
         ==========
             df_futures: pandas DataFrame with maturities in index as datetime
                 the DataFrame containing the futures rates
         """
-        bootstrap_dates = df_futures.index
-        cursor = self._data.index[-1]  # Last available discount date
-        reset_dates = futures_resets(bootstrap_dates, cursor)
-        for date in bootstrap_dates:
-            rate = df_futures.loc[date]
-            self.__bootstrap_futures(rate, date)
-            ranges = (reset_dates < date) & (reset_dates > cursor)
-            self.__fit_spots(reset_dates[ranges])
-            cursor = date
+        df_futures = df_futures.sort_index()
+        dates = pd.DatetimeIndex(df_futures.index)
+        rates = df_futures.reindex(columns=self.__discounts.columns).values
+        # Last available discount date
+        cursor = pd.Timestamp(self.__discounts.dates[-1])
+
+        resets = futures_reset(dates)
+        periods = self.daycounter(resets, dates).fraction()
+        growth = _futures_growth(np.asarray(periods)[:, np.newaxis], rates)
+
+        chained = np.zeros(len(dates), dtype=bool)
+        chained[1:] = resets[1:] == dates[:-1]
+        starts = np.flatnonzero(~chained)
+        for start, end in zip(starts, np.append(starts[1:], len(dates))):
+            self.fit_terms([resets[start]])
+            discounts = (
+                self.__discounts.row(resets[start])
+                / np.cumprod(growth[start:end], axis=0)
+            )
+            futures = self.__discounts.like(discounts,
+                                            dates[start:end].values,
+                                            None)
+            self.__update(futures.combine_first(self.__discounts))
+            self.__spots = self.__to_spots(futures).combine_first(
+                self.__spots
+            )
 
+        reset_dates = futures_resets(dates, cursor)
+        ranges = (reset_dates > cursor) & (reset_dates < dates[-1])
+        self.__fit_spots(reset_dates[ranges])
         self.__fit_discounts()
 
-    def bootstrap_swaps(self, df_swaps):
+    def bootstrap_swaps(self, df_swaps, method='iterative'):
         """Bootstrap discount factors from swap rates
 
         Parameters
@@ -153,7 +309,20 @@ class DiscountCurve(Curve):
                     1 for yearly
                     2 for bi-monthly
                     .. and so on
+            method: str, one of ('iterative', 'vectorized')
+                'iterative' bootstraps the swaps one maturity after the other.
+                'vectorized' builds the cash flow grid of all the swaps once,
+                interpolates the swap rates once and solves the discount
+                factors of each grid with a cumulative annuity recursion.
+                Both methods agree when all the swaps pay on the same
+                anniversary dates.
         """
+        assert method in ['iterative', 'vectorized']
+
+        if method == 'vectorized':
+            self.__bootstrap_swap_grids(df_swaps)
+            return
+
         bootstrap_dates = df_swaps.index
         for date in bootstrap_dates:
             cf_dates = swap_cashflow_dates([date], self.spot_date)
@@ -162,131 +331,174 @@ class DiscountCurve(Curve):
             first_date = cf_dates[0]
             df_swaps = df_swaps.combine_first(pd.DataFrame(index=cf_dates))
             self.fit_terms([first_date])
-            discount = self.get(first_date)
+            discount = self.__discounts.row(first_date)
             term = self.daycounter(self.spot_date, first_date).fraction()
-            df_swaps.loc[first_date] = (1/discount - 1) / term
+            df_swaps.loc[first_date] = _implied_rates(term, discount)
             interpolate(df_swaps, self.spot_date, self.daycounter)
             self.__bootstrap_swaps(df_swaps, cf_dates)
 
     def to_spot(self):
         """Convert discount factors to zero coupon rates"""
-        return SpotYieldCurve(df_rates=self.__spots,
+        return SpotYieldCurve(df_rates=self.__spots.to_frame(),
                               spot_date=self.spot_date,
                               daycounter=self.daycounter,
                               discounts=self)
 
     def to_forward(self):
         """Convert discount factors to forward rates"""
-        terms = self._compute_terms()
-        first_term = terms.iloc[0]
-        first_value = (1 / self._data.iloc[0] - 1) / first_term
-
-        diff = terms.diff().fillna(first_term)
-        df_forwards = self._data.shift(1).div(self._data, axis=0)
+        terms = self.__discounts.terms
+        values = self.__discounts.values
+        diff = np.diff(terms, prepend=0.)[1:, np.newaxis]
 
-        df_forwards = df_forwards.sub(1).div(diff, axis=0)
-        df_forwards.iloc[0] = first_value
+        forwards = np.empty_like(values)
+        forwards[0] = (1 / values[0] - 1) / terms[0]
+        forwards[1:] = (values[:-1] / values[1:] - 1) / diff
+        df_forwards = pd.DataFrame(forwards,
+                                   index=self.__discounts.index,
+                                   columns=self.__discounts.columns)
 
         return ForwardYieldCurve(df_forwards,
                                  self,
                                  self.spot_date,
                                  self.daycounter)
 
-    def to_swap(self):
-        """Convert discount factors to swap rates"""
-        df_swaps = self._data.copy()
-        for date in df_swaps.index:
-            term = self.daycounter(self.spot_date, date).fraction()
-            if term <= 1:
-                df_swaps.loc[date] = self.__spots.loc[date]
-            else:
-                cf_dates = swap_cashflow_dates([date], self.spot_date)
-                cf_dates.discard(self.spot_date)
-                cf_dates = sorted(cf_dates)
-                self.fit_terms(cf_dates)
-                rate = 1 - self._data.loc[date]
-                terms = self._compute_terms(cf_dates)
-                terms = terms.diff().fillna(terms.iloc[0])
-                cumul = self._data.loc[cf_dates].mul(terms, axis=0).sum()
-                df_swaps.loc[date] = rate / cumul
+    def to_swap(self, maturities=None, frequency=1):
+        """Convert discount factors to swap rates
+
+        The cash flow dates of all the swaps are generated and fitted once,
+        the swap rates are then read from the cumulative annuity of each
+        schedule.
+
+        Parameters
+        ==========
+            maturities: list like of datetime, optional
+                The maturities of the swaps, the pillars of the curve by
+                default
+
+            frequency: int
+                The number of swap payments a year
+        """
+        if maturities is None:
+            dates = self.__discounts.index
+        else:
+            dates = pd.DatetimeIndex(maturities)
+        terms = self.__discounts.like(
+            np.empty((len(dates), 0)), dates.values, None
+        ).terms
+
+        # Swaps maturing on the schedule of a longer swap share its schedule
+        schedules = []
+        covered = set()
+        for date in dates[terms > 1].sort_values()[::-1]:
+            if date in covered:
+                continue
+            cf_dates = swap_cashflow_dates([date],
+                                           self.spot_date,
+                                           frequency)
+            cf_dates.discard(self.spot_date)
+            covered.update(cf_dates)
+            schedules.append(sorted(cf_dates))
+
+        self.fit_terms(dates[terms <= 1].append(
+            pd.DatetimeIndex([date for cf in schedules for date in cf])
+        ))
+
+        swaps = np.full((len(dates), len(self.__discounts.columns)), np.nan)
+        short = np.flatnonzero(terms <= 1)
+        swaps[short] = self.__spots.rows(dates[short])
+        for cf_dates in schedules:
+            positions = self.__discounts.locate(cf_dates)
+            discounts = self.__discounts.values[positions]
+            diff = np.diff(self.__discounts.terms[positions], prepend=0.)
+            annuities = np.nancumsum(discounts * diff[:, np.newaxis], axis=0)
+            rates = (1 - discounts) / annuities
+
+            cf_dates = pd.DatetimeIndex(cf_dates)
+            found = cf_dates.get_indexer(dates)
+            found[terms <= 1] = -1
+            swaps[found >= 0] = rates[found[found >= 0]]
 
         return SwapYieldCurve(
-            df_swaps,
+            pd.DataFrame(swaps, index=dates, columns=self.__discounts.columns),
             self,
             self.spot_date,
             self.daycounter
         )
 
+    def __update(self, discounts):
+        self.__frame = None
+        self.__discounts = discounts
+        self._invalidate()
+
     def __fit_discounts(self):
-        long, short = self.__discount(self.__spots)
-        self._data = self._data.combine_first(short).combine_first(long)
+        discounts = self.__discount(self.__spots)
+        self.__update(self.__discounts.combine_first(discounts))
 
     def __fit_spots(self, maturities):
-        df_maturities = pd.DataFrame(index=maturities)
-        self.__spots = self.__spots.combine_first(df_maturities)
-        interpolate(self.__spots, self.spot_date, self.daycounter)
-
-    def __discount(self, df_spots):
-        terms = self._compute_terms(df_spots.index)
-        short_maturities = terms <= 1
-
-        rates = df_spots.loc[short_maturities]
-        short_discount = 1 / (1 + rates.mul(terms[short_maturities], axis=0))
-
-        rates = df_spots.loc[~short_maturities]
-        long_discount = 1 / ((1 + rates).pow(terms[~short_maturities], axis=0))
-
-        return short_discount, long_discount
+        self.__spots = self.__spots.insert(maturities).interpolate()
 
-    def __to_spots(self, df_spots=None):
-        if df_spots is None:
-            df_spots = self._data.copy()
+    def __discount(self, spots):
+        return spots.like(_discounts(spots.terms[:, np.newaxis],
+                                     spots.values))
 
-        terms = self._compute_terms(df_spots.index)
-        short_maturities = terms <= 1
-
-        # Compute short term zero rates
-        rates = df_spots.loc[short_maturities]
-        short_terms = terms[short_maturities]
-        df_spots.loc[short_maturities] = (1/rates - 1).div(short_terms, axis=0)
-
-        # Compute medium / long term zero rates
-        rates = df_spots.loc[~short_maturities]
-        fraction = 1 / terms[~short_maturities]
-        df_spots.loc[~short_maturities] = (1 / rates).pow(fraction, axis=0) - 1
-        return df_spots
-
-    def __compute_spot_rate(self, date, discount_rate):
-        term = self.daycounter(self.spot_date, date).fraction()
-        if term <= 1:
-            rate = (1 / discount_rate - 1) / term
-        else:
-            rate = (1 / discount_rate) ** (1 / term) - 1
-        return rate
-
-    def __bootstrap_futures(self, rate, date):
-        reset = futures_reset(date)
-        self.fit_terms([reset])
-        term = self.daycounter(reset, date).fraction()
-        discount = self.get(reset) / (1 + term * rate)
-        self._data.loc[date] = discount
-        self.__spots.loc[date] = self.__compute_spot_rate(date, discount)
+    def __to_spots(self, discounts):
+        return discounts.like(_spots(discounts.terms[:, np.newaxis],
+                                     discounts.values))
 
     def __bootstrap_swaps(self, df_swaps, cf_dates):
         cumul = 0
         previous_date = self.spot_date
-        discounts = [0]*len(cf_dates)
-        i = 0
-        for cf_date in cf_dates:
+        rates = df_swaps.loc[cf_dates].reindex(
+            columns=self.__discounts.columns
+        ).values
+        discounts = np.empty_like(rates)
+        for i, cf_date in enumerate(cf_dates):
             diff = self.daycounter(previous_date, cf_date).fraction()
-            rate = df_swaps.loc[cf_date]
-            discount = (1 - cumul * rate) / (1 + rate * diff)
+            rate = rates[i]
+            discount = _par_discounts(diff, cumul, rate)
             discounts[i] = discount
-            cumul = cumul + discount * diff
+            cumul = _accrue(diff, cumul, discount)
             previous_date = cf_date
-            i = i + 1
-        discounts = pd.DataFrame(discounts, index=cf_dates)
-        self._data = self._data.combine_first(discounts)
+        self.__merge_swap_discounts(discounts, cf_dates)
+
+    def __bootstrap_swap_grids(self, df_swaps):
+        columns = self.__discounts.columns
+        quotes = _Pillars.from_frame(df_swaps.reindex(columns=columns),
+                                     self.spot_date,
+                                     self.daycounter)
+
+        grids = _swap_grids(quotes.index, self.spot_date)
+
+        # The first rate of each grid is implied by the current curve
+        first_dates = [cf_dates[0] for cf_dates in grids]
+        self.fit_terms(first_dates)
+        first = _Pillars.from_frame(
+            pd.DataFrame(self.__discounts.rows(first_dates),
+                         index=first_dates,
+                         columns=columns),
+            self.spot_date,
+            self.daycounter
+        )
+        first = first.like(_implied_rates(first.terms[:, np.newaxis],
+                                          first.values))
+
+        rates = first.combine_first(quotes)
+        rates = rates.insert(np.concatenate(grids)).interpolate()
+        for cf_dates in grids:
+            diffs = self.daycounter([self.spot_date] + cf_dates[:-1],
+                                    cf_dates).fraction()
+            discounts = _annuity_discounts(rates.rows(cf_dates), diffs)
+            self.__merge_swap_discounts(discounts, cf_dates)
+
+    def __merge_swap_discounts(self, discounts, cf_dates):
+        discounts = _Pillars.from_frame(
+            pd.DataFrame(discounts,
+                         index=cf_dates,
+                         columns=self.__discounts.columns),
+            self.spot_date,
+            self.daycounter
+        )
+        self.__update(self.__discounts.combine_first(discounts))
         self.__spots = self.__to_spots(discounts).combine_first(self.__spots)
 
 
@@ -317,22 +529,14 @@ class SpotYieldCurve(YieldCurve):
         self.discounts.bootstrap_spots(self._data.loc[maturities])
 
     def _compute_cashflows(self, series, dates):
-        terms = self._compute_terms(dates)
-        short, longs = terms <= 1, terms > 1
-        matrix = np.diag(
-            series.loc[dates][short].dropna()
-            .mul(terms[short], axis=0)
-            .add(1)
-            .append(
-                series.loc[dates][longs].dropna()
-                .add(1)
-                .pow(terms[longs], axis=0)
-            )
-        )
-
-        df_cashflows = pd.DataFrame(matrix, columns=dates)
-        df_cashflows['prices'] = 1
-        return df_cashflows
+        dates = pd.DatetimeIndex(dates)
+        terms = self._compute_terms(dates).values
+        rates = series.loc[dates].values
+        values = np.where(terms <= 1, 1 + rates * terms, (1 + rates) ** terms)
+        return CashflowMatrix.from_entries(np.arange(len(dates)),
+                                           dates,
+                                           values,
+                                           np.ones(len(dates)))
 
 
 class ForwardYieldCurve(YieldCurve):
@@ -357,24 +561,19 @@ class ForwardYieldCurve(YieldCurve):
         """Build Cashflow matrix from futures securities maturing
         in `futures_dates`
         """
-        rolls = pd.DatetimeIndex(map(futures_reset, dates))
-
-        df_cashflows = pd.DataFrame(
-            columns=rolls.union(dates),
-            index=list(range(len(dates))),
-            dtype=np.float
+        dates = pd.DatetimeIndex(dates)
+        rolls = pd.DatetimeIndex(futures_reset(dates))
+        diff = (dates - rolls).days.values / 360
+        rows = np.arange(len(dates))
+
+        return CashflowMatrix.from_entries(
+            np.concatenate([rows, rows]),
+            rolls.append(dates),
+            np.concatenate([-np.ones(len(dates)),
+                            1 + series.loc[dates].values * diff]),
+            np.zeros(len(dates))
         )
 
-        i = 0
-        for date, reset in zip(dates, rolls):
-            df_cashflows.loc[i, reset] = -1
-            diff = (date - reset).days / 360
-            df_cashflows.loc[i, date] = 1 + series.loc[date] * diff
-            i += 1
-
-        df_cashflows['prices'] = 0
-        return df_cashflows.fillna(0)
-
 
 class SwapYieldCurve(YieldCurve):
     """Create an instance of a Swap yield curve
@@ -390,47 +589,176 @@ class SwapYieldCurve(YieldCurve):
         self._discounts = discount_curve
 
     def _compute_cashflows(self, series, dates):
-        df_cashflows = pd.DataFrame(dtype=np.float, index=range(len(dates)))
-        i = 0
-        prices = [0] * len(dates)
-
-        for date in dates:
-            rate = series.loc[date]
-            cf_dates = sorted(swap_cashflow_dates([date], self.spot_date))
-            effective_dates = cf_dates[1:-1]
-            terms = self._compute_terms(cf_dates)
-            terms = terms.diff().fillna(terms.iloc[0])
-
-            df_ = pd.DataFrame(
-                [rate * terms[effective_dates]],
-                index=[i],
-                columns=effective_dates
-            )
+        dates = pd.DatetimeIndex(dates)
+        offsets, cf_dates = swap_cashflow_schedule(dates, self.spot_date)
+        counts = np.diff(offsets)
+        rows = np.repeat(np.arange(len(dates)), counts)
+        first, last = offsets[:-1], offsets[1:] - 1
+
+        # Accrual period of each cash flow, the first one starts at spot
+        terms = self._compute_terms(pd.DatetimeIndex(cf_dates)).values
+        periods = np.diff(terms, prepend=0.)
+        periods[first] = terms[first]
+
+        rates = series.loc[dates].values[rows]
+        values = rates * periods
+        starts = cf_dates[first] == np.datetime64(self.spot_date, 'D')
+        values[first] = np.where(starts, 0, -1)
+        values[last] = 1 + rates[last] * periods[last]
+
+        # Swaps starting at spot have no cash flow on the spot date
+        keep = np.ones(len(values), dtype=bool)
+        keep[first[starts & (counts > 1)]] = False
+        return CashflowMatrix.from_entries(rows[keep],
+                                           cf_dates[keep],
+                                           values[keep],
+                                           starts.astype(np.float64))
+
+
+def _swap_grids(dates, spot_date):
+    """Returns the sorted cash flow dates of the swaps maturing at the
+    sorted `dates`, shortest grid first. A swap maturing on the cash flow
+    grid of a longer swap shares its grid, thus only one grid per
+    anniversary date is generated."""
+    grids = []
+    covered = set()
+    for date in dates[::-1]:
+        if date in covered:
+            continue
+        cf_dates = swap_cashflow_dates([date], spot_date)
+        cf_dates.discard(spot_date)
+        covered.update(cf_dates)
+        grids.append(sorted(cf_dates))
+    return grids[::-1]
+
+
+def _annuity_discounts(rates, diffs):
+    """Solves the par swap equations of a cash flow grid
+
+    Each row of `rates` is the swap rate of the swap maturing at the
+    corresponding date of the grid and `diffs` are the year fractions of the
+    periods of the grid. The annuity A(i) = A(i-1) / (1 + r(i) d(i)) +
+    d(i) / (1 + r(i) d(i)) is a linear recursion, solved with a cumulative
+    product and a cumulative sum.
+    """
+    diffs = np.asarray(diffs, dtype=np.float64)[:, np.newaxis]
+    growth = _simple_discounts(diffs, rates)
+    products = np.cumprod(growth, axis=0)
+    annuities = products * np.cumsum(_annuity_terms(diffs, growth, products),
+                                     axis=0)
+    previous = np.zeros_like(annuities)
+    previous[1:] = annuities[:-1]
+    return _annuity_steps(previous, rates, growth)
+
+
+# Elementwise formulas of the bootstrap, also replayed quote by quote by
+# `LiveCurve`: the year fractions (or periods) come first
+
+
+def _simple_discounts(terms, rates):
+    """Discount factors of simple rates"""
+    return 1 / (1 + rates * terms)
+
+
+def _implied_rates(terms, discounts):
+    """Simple rates of discount factors"""
+    return (1 / discounts - 1) / terms
+
+
+def _discounts(terms, spots):
+    """Discount factors of spot rates, simple up to one year and annually
+    compounded after"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(terms <= 1,
+                        _simple_discounts(terms, spots),
+                        1 / ((1 + spots) ** terms))
+
+
+def _spots(terms, discounts):
+    """Spot rates of discount factors, see `_discounts`"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(terms <= 1,
+                        _implied_rates(terms, discounts),
+                        (1 / discounts) ** (1 / terms) - 1)
+
+
+def _futures_growth(periods, rates):
+    """Growth of a unit invested at the futures rates over their periods"""
+    return 1 + periods * rates
 
-            df_cashflows = df_.combine_first(df_cashflows)
 
-            if cf_dates[0] == self.spot_date:
-                prices[i] = 1
+def _par_discounts(diffs, cumuls, rates):
+    """Discount factors of the next payment of par swaps, `cumuls` being
+    the annuities up to the previous payment"""
+    return (1 - cumuls * rates) / (1 + rates * diffs)
 
-            else:
-                df_cashflows.loc[i, cf_dates[0]] = -1
-            df_cashflows.loc[i, cf_dates[-1]] = 1 + rate * terms[cf_dates[-1]]
-            i = i + 1
 
-        df_cashflows['prices'] = prices
-        return df_cashflows.fillna(0)
+def _accrue(diffs, cumuls, discounts):
+    """Annuities up to the payment of `discounts`"""
+    return cumuls + discounts * diffs
+
+
+def _annuity_terms(diffs, growth, products):
+    """Terms of the cumulative sum of `_annuity_discounts`"""
+    return diffs * growth / products
+
+
+def _annuity_steps(previous, rates, growth):
+    """Discount factors of `_annuity_discounts` from the previous
+    annuities"""
+    return (1 - previous * rates) * growth
 
 
 def _invert(cash, terms, prices):
-    terms = np.sqrt(terms.diff().fillna(terms.iloc[0]).values)
-
-    one = np.zeros(len(terms)).transpose()
-    one[0] = 1
-
-    w_inverse = np.diag(terms)
-    m_inverse = np.tril([1] * len(terms))
-    mat = cash.dot(m_inverse.dot(w_inverse))
-    m_t = mat.transpose()
-    mmt_inverse = np.linalg.inv(mat.dot(m_t))
-    delta = m_t.dot(mmt_inverse).dot(prices - cash.dot(m_inverse.dot(one)))
-    return m_inverse.dot(w_inverse.dot(delta) + one)
+    """Returns the smoothest discount factors pricing the instruments
+
+    With M the lower triangular matrix of ones and W the diagonal matrix of
+    the square roots of the periods, the discount factors are
+    M (W delta + e_0) where delta is the minimum norm solution of
+    C M W delta = p - C M e_0. Both M and W only appear through
+    K = M W^2 M', so that the solution is 1 + K C' y where
+    (C K C') y = p - C 1. K is applied with cumulative sums: the cash
+    flows stay sparse and only the (instruments x instruments) system is
+    dense.
+    """
+    periods = np.diff(np.asarray(terms, dtype=np.float64), prepend=0.)
+    cash = sparse.csr_matrix(cash, dtype=np.float64, copy=True)
+    cash.sum_duplicates()
+
+    gram = _kernel_gram(cash, periods)
+    rhs = prices.reshape(len(prices), -1)
+    rhs = rhs - np.asarray(cash.sum(axis=1)).reshape(-1, 1)
+
+    try:
+        solution = linalg.cho_solve(linalg.cho_factor(gram), rhs)
+    except linalg.LinAlgError:
+        solution = np.linalg.lstsq(gram, rhs, rcond=None)[0]
+
+    discounts = 1 + _cumulative_kernel(np.asarray(cash.T @ solution),
+                                       periods)
+    if prices.ndim == 1:
+        return discounts[:, 0]
+    return discounts
+
+
+def _kernel_gram(cash, periods, block=256):
+    """Returns C K C' from the CSR matrix C
+
+    K C' is applied to blocks of `block` instruments at a time, so that the
+    dense work space is bounded by dates x `block` whatever the number of
+    instruments.
+    """
+    size = cash.shape[0]
+    transpose = cash.T.tocsc()
+    gram = np.empty((size, size))
+    for start in range(0, size, block):
+        columns = transpose[:, start:start + block].toarray()
+        gram[:, start:start + block] = cash @ _cumulative_kernel(columns,
+                                                                 periods)
+    return gram
+
+
+def _cumulative_kernel(values, periods):
+    """Applies K = M W^2 M' to the columns of `values`"""
+    reverse = np.cumsum(values[::-1], axis=0)[::-1]
+    return np.cumsum(periods[:, np.newaxis] * reverse, axis=0)
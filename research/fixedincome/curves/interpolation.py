@@ -0,0 +1,308 @@
+"""
+Interpolation engine of term structures.
+
+The year fractions of the pillars are computed once and the interpolated
+values of many dates are looked up at once. Supported schemes:
+
+    linear: linear on the values (rates), flat outside the pillars
+    log_linear: linear on the log of the values (discount factors), the
+        discount factor of the spot date is 1 and the last forward rate is
+        extended after the last pillar
+    monotone_convex: Hagan & West (2006) monotone convex method on the values
+        seen as zero rates, flat after the last pillar
+"""
+
+# pylint: disable=import-error
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from research.dates.daycounter import Actual360
+from research.dates.utils import today
+
+SCHEMES = ('linear', 'log_linear', 'monotone_convex')
+
+# Hagan & West periods of the query terms, with the spot date added to the
+# pillars, and the forward adjustments at their bounds
+_Pieces = namedtuple('_Pieces', [
+    'terms', 'rates', 'discrete', 'nodes', 'clipped', 'start', 'period',
+    'length', 'x', 'g_0', 'g_1'
+])
+
+
+class Interpolator:
+    """Creates an interpolator of the pillars of a term structure
+
+    The frame is copied, the caller's DataFrame is never modified.
+
+    Parameters
+    ==========
+
+        df_values: Pandas DataFrame with maturities as index.
+            Contains rates or discount factors, missing values are ignored
+
+        spot_date: datetime
+            the evaluation date
+
+        daycounter: fdates.daycounter class
+            The day count convention to be used : default (Act/360)
+
+        scheme: str
+            One of ('linear', 'log_linear', 'monotone_convex')
+    """
+
+    def __init__(self,
+                 df_values,
+                 spot_date=today,
+                 daycounter=Actual360,
+                 scheme='linear'):
+
+        assert scheme in SCHEMES
+        self.scheme = scheme
+        self.spot_date = spot_date
+        self.daycounter = daycounter
+        self.columns = df_values.columns
+        self.dates = pd.DatetimeIndex(df_values.index)
+        self.terms = self.__compute_fractions(self.dates)
+        self.values = df_values.values.astype(np.float64)
+
+        order = np.argsort(self.terms, kind='stable')
+        self.__pillars = [
+            (self.terms[order][valid], column[valid])
+            for column in self.values[order].T
+            for valid in [~np.isnan(column)]
+        ]
+
+    def fractions(self, dates):
+        """Returns the year fractions of `dates`, reusing the ones of the
+        pillars"""
+        dates = pd.DatetimeIndex(np.atleast_1d(dates))
+        positions = self.dates.get_indexer(dates)
+        found = positions >= 0
+        if found.all():
+            return self.terms[positions]
+
+        terms = np.empty(len(dates))
+        terms[found] = self.terms[positions[found]]
+        terms[~found] = self.__compute_fractions(dates[~found])
+        return terms
+
+    def at_terms(self, terms):
+        """Returns the interpolated values (terms x columns) at the year
+        fractions `terms`"""
+        terms = np.asarray(terms, dtype=np.float64)
+        values = np.full((len(terms), len(self.columns)), np.nan)
+        for i, (xp, fp) in enumerate(self.__pillars):
+            if len(xp):
+                values[:, i] = interpolate_terms(xp, fp, terms, self.scheme)
+        return values
+
+    def at(self, dates):
+        """Returns the interpolated values (dates x columns) at `dates`"""
+        return self.at_terms(self.fractions(dates))
+
+    def __call__(self, dates):
+        """Returns the interpolated values on `dates` as a DataFrame"""
+        dates = pd.DatetimeIndex(np.atleast_1d(dates))
+        return pd.DataFrame(self.at(dates), index=dates, columns=self.columns)
+
+    def fill(self):
+        """Returns a copy of the pillars with the missing values filled"""
+        values = np.where(np.isnan(self.values),
+                          self.at_terms(self.terms),
+                          self.values)
+        return pd.DataFrame(values, index=self.dates, columns=self.columns)
+
+    def __compute_fractions(self, dates):
+        if len(dates) == 0:
+            return np.empty(0)
+        fractions = self.daycounter(self.spot_date, dates).fraction()
+        return np.asarray(fractions, dtype=np.float64)
+
+
+def interpolate_terms(terms, values, query, scheme='linear'):
+    """Interpolates the `values` observed at the increasing year fractions
+    `terms` on the year fractions `query`
+
+    Parameters
+    ==========
+        terms: numpy array
+            The increasing year fractions of the pillars
+
+        values: numpy array
+            The values of the pillars, without missing values
+
+        query: numpy array
+            The year fractions to be interpolated
+
+        scheme: str
+            One of ('linear', 'log_linear', 'monotone_convex')
+    """
+    assert scheme in SCHEMES
+    if scheme == 'linear':
+        return np.interp(query, terms, values)
+    if scheme == 'log_linear':
+        return _log_linear(terms, values, query)
+    return _monotone_convex(terms, values, query)
+
+
+def _log_linear(terms, discounts, query):
+    if terms[0] > 0:
+        terms = np.concatenate([[0.], terms])
+        discounts = np.concatenate([[1.], discounts])
+    logs = np.log(discounts)
+    values = np.interp(query, terms, logs)
+    if len(terms) > 1:
+        slope = (logs[-1] - logs[-2]) / (terms[-1] - terms[-2])
+        after = query > terms[-1]
+        values[after] = logs[-1] + slope * (query[after] - terms[-1])
+    return np.exp(values)
+
+
+def monotone_convex_forwards(terms, rates, query):
+    """Returns the instantaneous forward rates and their derivatives of the
+    monotone convex interpolation of the zero rates `rates` observed at the
+    increasing year fractions `terms`, flat after the last pillar"""
+    query = np.asarray(query, dtype=np.float64)
+    if len(terms) == 1:
+        return np.full(len(query), rates[0]), np.zeros(len(query))
+
+    pieces = _monotone_convex_pieces(terms, rates, query)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        adjustment, slope = _monotone_convex_adjustment(pieces.g_0,
+                                                        pieces.g_1,
+                                                        pieces.x)
+    after = query > terms[-1]
+    forwards = pieces.discrete[pieces.period - 1] + adjustment
+    return (np.where(after, rates[-1], forwards),
+            np.where(after, 0, slope / pieces.length))
+
+
+def _monotone_convex(terms, rates, query):
+    query = np.asarray(query, dtype=np.float64)
+    if len(terms) == 1:
+        return np.full(len(query), rates[0])
+
+    pieces = _monotone_convex_pieces(terms, rates, query)
+    clipped, start, period = pieces.clipped, pieces.start, pieces.period
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        integral = _monotone_convex_integral(pieces.g_0, pieces.g_1, pieces.x)
+        values = (
+            pieces.rates[period - 1] * start
+            + pieces.discrete[period - 1] * (clipped - start)
+            + pieces.length * integral
+        ) / clipped
+
+    # The rate at the spot date is the instantaneous forward
+    values = np.where(clipped == 0, pieces.nodes[0], values)
+    return np.where(query > terms[-1], rates[-1], values)
+
+
+def _monotone_convex_pieces(terms, rates, query):
+    if terms[0] > 0:
+        terms = np.concatenate([[0.], terms])
+        rates = np.concatenate([[rates[0]], rates])
+
+    # Discrete forwards of each period and instantaneous forwards at nodes
+    lengths = np.diff(terms)
+    discrete = np.diff(rates * terms) / lengths
+    nodes = np.empty(len(terms))
+    nodes[1:-1] = (
+        lengths[:-1] * discrete[1:] + lengths[1:] * discrete[:-1]
+    ) / (lengths[:-1] + lengths[1:])
+    nodes[0] = discrete[0] - 0.5 * (nodes[1] - discrete[0])
+    nodes[-1] = discrete[-1] - 0.5 * (nodes[-2] - discrete[-1])
+
+    clipped = np.clip(query, terms[0], terms[-1])
+    period = np.clip(np.searchsorted(terms, clipped, side='left'),
+                     1, len(terms) - 1)
+    start, length = terms[period - 1], lengths[period - 1]
+    x = (clipped - start) / length
+    g_0 = nodes[period - 1] - discrete[period - 1]
+    g_1 = nodes[period] - discrete[period - 1]
+    return _Pieces(terms, rates, discrete, nodes, clipped, start, period,
+                   length, x, g_0, g_1)
+
+
+def _monotone_convex_cases(g_0, g_1):
+    """Masks of the zero, quadratic, flat start and flat end cases of Hagan
+    & West, the remaining terms are flat in the middle"""
+    zero = (g_0 == 0) & (g_1 == 0)
+    case_1 = (
+        (g_0 < 0) & (-0.5 * g_0 <= g_1) & (g_1 <= -2 * g_0)
+        | (g_0 > 0) & (-0.5 * g_0 >= g_1) & (g_1 >= -2 * g_0)
+    )
+    case_2 = (g_0 < 0) & (g_1 > -2 * g_0) | (g_0 > 0) & (g_1 < -2 * g_0)
+    case_3 = (
+        (g_0 > 0) & (0 > g_1) & (g_1 > -0.5 * g_0)
+        | (g_0 < 0) & (0 < g_1) & (g_1 < -0.5 * g_0)
+    )
+    return [zero, case_1, case_2, case_3]
+
+
+def _monotone_convex_adjustment(g_0, g_1, x):
+    """Hagan & West forward adjustment g at x and its derivative in x"""
+    quadratic = g_0 * (1 - 4 * x + 3 * x ** 2) + g_1 * (3 * x ** 2 - 2 * x)
+    d_quadratic = g_0 * (6 * x - 4) + g_1 * (6 * x - 2)
+
+    eta = (g_1 + 2 * g_0) / (g_1 - g_0)
+    right = np.where(x > eta, (x - eta) / (1 - eta), 0)
+    flat_start = g_0 + (g_1 - g_0) * right ** 2
+    d_flat_start = 2 * (g_1 - g_0) * right / (1 - eta)
+
+    eta = 3 * g_1 / (g_1 - g_0)
+    left = np.clip((eta - x) / eta, 0, None)
+    flat_end = g_1 + (g_0 - g_1) * left ** 2
+    d_flat_end = -2 * (g_0 - g_1) * left / eta
+
+    eta = g_1 / (g_0 + g_1)
+    level = -g_0 * g_1 / (g_0 + g_1)
+    left = np.clip((eta - x) / eta, 0, None)
+    right = np.where(x > eta, (x - eta) / (1 - eta), 0)
+    both_sides = level + (g_0 - level) * left ** 2 \
+        + (g_1 - level) * right ** 2
+    d_both_sides = -2 * (g_0 - level) * left / eta \
+        + 2 * (g_1 - level) * right / (1 - eta)
+
+    cases = _monotone_convex_cases(g_0, g_1)
+    zeros = np.zeros_like(x)
+    return (
+        np.select(cases, [zeros, quadratic, flat_start, flat_end],
+                  both_sides),
+        np.select(cases, [zeros, d_quadratic, d_flat_start, d_flat_end],
+                  d_both_sides)
+    )
+
+
+def _monotone_convex_integral(g_0, g_1, x):
+    """Integral over [0, x] of the Hagan & West forward adjustment g"""
+    quadratic = g_0 * (x - 2 * x ** 2 + x ** 3) + g_1 * (x ** 3 - x ** 2)
+
+    eta = (g_1 + 2 * g_0) / (g_1 - g_0)
+    flat_start = g_0 * x + (g_1 - g_0) / 3 * np.where(
+        x > eta, (x - eta) ** 3 / (1 - eta) ** 2, 0
+    )
+
+    eta = 3 * g_1 / (g_1 - g_0)
+    flat_end = g_1 * x + (g_0 - g_1) * eta / 3 * (
+        1 - np.clip((eta - x) / eta, 0, None) ** 3
+    )
+
+    eta = g_1 / (g_0 + g_1)
+    level = -g_0 * g_1 / (g_0 + g_1)
+    left = (g_0 - level) * eta / 3 * (
+        1 - np.clip((eta - x) / eta, 0, None) ** 3
+    )
+    right = (g_1 - level) / 3 * np.where(
+        x > eta, (x - eta) ** 3 / (1 - eta) ** 2, 0
+    )
+    both_sides = level * x + left + right
+
+    return np.select(
+        _monotone_convex_cases(g_0, g_1),
+        [np.zeros_like(x), quadratic, flat_start, flat_end],
+        both_sides
+    )
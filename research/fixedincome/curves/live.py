@@ -0,0 +1,516 @@
+"""
+Live discount curve maintained from quote updates.
+
+The bootstrap of the curve from its quotes (spot, futures and swap rates)
+is recorded once as a tape of scalar operations: the pillars, the futures
+chains, the swap cash flow grids and the interpolation brackets only depend
+on the dates of the quotes. An update replays, in the order of the
+bootstrap, the operations reading the changed quotes directly or not. The
+operations are the elementwise formulas of `DiscountCurve` itself, applied
+to one element arrays. A spot or futures quote thus re-chains the pillars
+from the ones it moves, as a swap quote does, and the discount factors that
+changed are published as a delta. The DiscountCurve object itself is only
+rebuilt when read, or after every update with `check` to verify the delta.
+"""
+
+# pylint: disable=import-error
+
+import heapq
+
+import numpy as np
+import pandas as pd
+
+from research.dates.daycounter import Actual360
+from research.dates.utils import today
+
+from ..utils import futures_reset, futures_resets, swap_cashflow_dates
+from ._staged import _StagedCurve
+from .api import (
+    _accrue,
+    _annuity_steps,
+    _annuity_terms,
+    _discounts,
+    _futures_growth,
+    _implied_rates,
+    _par_discounts,
+    _simple_discounts,
+    _spots,
+    _swap_grids
+)
+
+
+class LiveCurve:
+    """Creates a live discount curve
+
+    Parameters
+    ==========
+
+        df_spots: pandas DataFrame or Series with maturities as index
+            The zero coupon rates the curve starts from
+
+        df_futures: pandas DataFrame or Series with maturities as index
+            The futures rates bootstrapped after the spot rates
+
+        df_swaps: pandas DataFrame or Series with maturities as index
+            The swap rates bootstrapped last
+
+        spot_date: datetime
+            the evaluation date
+
+        daycounter: fdates.daycounter class
+            The day count convention to be used : default (Act/360)
+
+        method: str, one of ('iterative', 'vectorized')
+            The swap bootstrap method, see `DiscountCurve.bootstrap_swaps` :
+            default 'iterative'
+
+        check: bool
+            Whether every update is verified against the rebuilt curve, see
+            `verify` : default False
+    """
+
+    def __init__(self,
+                 df_spots,
+                 df_futures=None,
+                 df_swaps=None,
+                 spot_date=today,
+                 daycounter=Actual360,
+                 method='iterative',
+                 check=False):
+
+        assert method in ['iterative', 'vectorized']
+        self.check = check
+        self.__staged = _StagedCurve(df_spots, df_futures, df_swaps,
+                                     spot_date, daycounter, method)
+        self.__subscribers = []
+        # First stage whose quotes changed since the curve was last built
+        self.__stale = None
+
+        bootstrap = _Bootstrap(spot_date, daycounter)
+        self.__stages = {}
+        for position, (stage, rates) in enumerate(self.__staged.stages):
+            bootstrap.apply(stage, rates, method)
+            self.__stages[stage] = position
+        self.__tape = bootstrap.tape
+        self.__quotes = bootstrap.quotes
+
+        self.__dates = pd.DatetimeIndex(sorted(bootstrap.pillars))
+        self.__slots = [bootstrap.pillars[date][1] for date in self.__dates]
+        self.__positions = {}
+        for position, slot in enumerate(self.__slots):
+            self.__positions.setdefault(slot, []).append(position)
+        self.__tape.compile(self.__slots)
+
+    @property
+    def pillars(self):
+        """The (stage, maturity) of the quotes"""
+        return self.__staged.pillars
+
+    @property
+    def quotes(self):
+        """The current quotes indexed by (stage, maturity)"""
+        values = self.__tape.values
+        return pd.Series([values[slot] for slot in self.__quotes.values()],
+                         index=self.pillars)
+
+    @property
+    def curve(self):
+        """The current DiscountCurve, shared and not to be modified"""
+        if self.__stale is not None:
+            values = self.__tape.values
+            for stage, rates in self.__staged.stages:
+                rates.iloc[:] = [values[self.__quotes[(stage, date)]]
+                                 for date in rates.index]
+            self.__staged.rebuild(self.__stale)
+            self.__stale = None
+        return self.__staged.curve
+
+    @property
+    def discounts(self):
+        """The current discount factors of the pillars of the curve"""
+        values = self.__tape.values
+        return pd.Series([values[slot] for slot in self.__slots],
+                         index=self.__dates,
+                         dtype=np.float64)
+
+    def verify(self):
+        """Raises a ValueError if the replayed discount factors differ from
+        the ones of the rebuilt curve"""
+        discounts = self.discounts
+        expected = self.curve.term_structure.iloc[:, 0]
+        if not expected.index.equals(discounts.index):
+            raise ValueError('Live curve pillars differ from the curve')
+        wrong = discounts.index[discounts.values != expected.values]
+        if len(wrong) > 0:
+            raise ValueError(
+                f'Live discount factors differ from the curve at {wrong}'
+            )
+
+    def dependencies(self, stage, maturity):
+        """Returns the pillars of the curve that may change with the quote
+        of `stage` and `maturity`"""
+        slot = self.__quotes[(stage, pd.Timestamp(maturity))]
+        return self.__pillars(self.__tape.reach([slot]))
+
+    def subscribe(self, callback):
+        """Registers `callback`, called with the delta of every update"""
+        self.__subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """Removes a registered `callback`"""
+        self.__subscribers.remove(callback)
+
+    def update(self, quotes):
+        """Updates quotes, rebootstraps the affected pillars and returns the
+        changed discount factors as a Series, also published to the
+        subscribers
+
+        Parameters
+        ==========
+            quotes: dict or pandas Series indexed by (stage, maturity)
+                The new rates
+        """
+        if isinstance(quotes, pd.Series):
+            quotes = quotes.to_dict()
+
+        values = self.__tape.values
+        changed = []
+        for (stage, maturity), rate in quotes.items():
+            slot = self.__quotes[(stage, pd.Timestamp(maturity))]
+            rate = float(rate)
+            if values[slot] == rate:
+                continue
+            values[slot] = rate
+            changed.append(slot)
+            position = self.__stages[stage]
+            if self.__stale is None or position < self.__stale:
+                self.__stale = position
+
+        if not changed:
+            return pd.Series(dtype=np.float64)
+
+        dates = self.__pillars(self.__tape.replay(changed))
+        delta = pd.Series([values[self.__slots[i]]
+                           for i in self.__dates.get_indexer(dates)],
+                          index=dates,
+                          dtype=np.float64)
+        if self.check:
+            self.verify()
+        for callback in self.__subscribers:
+            callback(delta)
+        return delta
+
+    def __pillars(self, slots):
+        """Returns the dates of the pillars whose discount factors are in
+        `slots`"""
+        positions = sorted(position
+                           for slot in slots
+                           for position in self.__positions.get(slot, ()))
+        return self.__dates[positions]
+
+
+class _Tape:
+    """Scalar operations recorded in the order of a computation
+
+    Each operation computes `function(*params, *values of its inputs)` into
+    its own slot, so that the operations are replayed in the recorded order
+    from any changed input. An operation recorded again on the same inputs
+    reuses the slot of the first one.
+    """
+
+    def __init__(self):
+        self.values = []
+        self.ops = []
+        self.readers = None
+        self.__memo = {}
+
+    def constant(self, value):
+        """Returns the slot of a new input `value`"""
+        self.values.append(float(value))
+        return len(self.values) - 1
+
+    def record(self, function, params, *inputs):
+        """Computes and records an operation, returns its slot"""
+        key = (function, params, inputs)
+        slot = self.__memo.get(key)
+        if slot is None:
+            slot = self.constant(_evaluate(
+                function, params + tuple(self.values[i] for i in inputs)
+            ))
+            self.ops.append((function, params, inputs, slot))
+            self.__memo[key] = slot
+        return slot
+
+    def compile(self, outputs):
+        """Drops the operations that do not lead to the slots `outputs` and
+        indexes the operations reading each slot"""
+        needed = set(outputs)
+        kept = []
+        for operation in reversed(self.ops):
+            if operation[3] in needed:
+                needed.update(operation[2])
+                kept.append(operation)
+        self.ops = kept[::-1]
+        self.readers = [[] for _ in self.values]
+        for index, (_, _, inputs, _) in enumerate(self.ops):
+            for slot in set(inputs):
+                self.readers[slot].append(index)
+        self.__memo = None
+
+    def reach(self, slots):
+        """Returns the slots computed from `slots`, directly or not"""
+        reached = set(slots)
+        pending = list(slots)
+        while pending:
+            for index in self.readers[pending.pop()]:
+                slot = self.ops[index][3]
+                if slot not in reached:
+                    reached.add(slot)
+                    pending.append(slot)
+        return reached
+
+    def replay(self, slots):
+        """Recomputes the operations reading the changed `slots`, directly
+        or not, and returns the slots whose value changed"""
+        values, ops, readers = self.values, self.ops, self.readers
+        changed = set(slots)
+        # Readers are recorded after the operations they read, the
+        # operations are thus recomputed by increasing index
+        pending = sorted({index for slot in slots for index in readers[slot]})
+        queued = set(pending)
+        while pending:
+            function, params, inputs, slot = ops[heapq.heappop(pending)]
+            value = _evaluate(function,
+                              params + tuple(values[i] for i in inputs))
+            if value == values[slot]:
+                continue
+            values[slot] = value
+            changed.add(slot)
+            for index in readers[slot]:
+                if index not in queued:
+                    queued.add(index)
+                    heapq.heappush(pending, index)
+        return changed
+
+
+class _Bootstrap:
+    """Records the bootstrap of `DiscountCurve` stage by stage on a tape
+
+    The pillars follow the discount factors and the spot rates of the curve:
+    `from_spots`, `fit_terms`, `bootstrap_futures` and `bootstrap_swaps` are
+    mirrored operation by operation.
+    """
+
+    def __init__(self, spot_date, daycounter):
+        self.spot_date = spot_date
+        self.daycounter = daycounter
+        self.tape = _Tape()
+        # Annuity before the first payment of a swap
+        self.zero = self.tape.constant(0.)
+        # Slot of each quote by (stage, maturity)
+        self.quotes = {}
+        # Year fraction, discount factor slot and spot rate slot by date
+        self.pillars = {}
+
+    def apply(self, stage, rates, method):
+        """Records the bootstrap of the `rates` of `stage`"""
+        slots = []
+        for date, rate in rates.items():
+            slots.append(self.tape.constant(rate))
+            self.quotes[(stage, date)] = slots[-1]
+        if stage == 'spot':
+            self.spots(rates.index, slots)
+        elif stage == 'futures':
+            self.futures(rates.index, slots)
+        elif method == 'iterative':
+            self.swaps(rates.index, slots)
+        else:
+            self.swap_grids(rates.index, slots)
+
+    def terms(self, dates):
+        """Returns the year fractions of `dates`"""
+        return _fractions(self.daycounter, self.spot_date,
+                          pd.DatetimeIndex(dates))
+
+    def spots(self, dates, slots):
+        """Same as `DiscountCurve.from_spots`"""
+        record = self.tape.record
+        for date, term, slot in zip(dates, self.terms(dates), slots):
+            discount = record(_simple_discounts, (term,), slot)
+            self.pillars[date] = (term, discount,
+                                  record(_spots, (term,), discount))
+
+    def fit(self, dates):
+        """Same as `DiscountCurve.fit_terms`: the spot rates of the new dates
+        are interpolated on the current pillars"""
+        dates = sorted({pd.Timestamp(date) for date in dates}
+                       - set(self.pillars))
+        if not dates:
+            return
+        known = sorted(self.pillars)
+        terms = np.array([self.pillars[date][0] for date in known])
+        spots = [self.pillars[date][2] for date in known]
+        for date, term in zip(dates, self.terms(dates)):
+            spot = self.interpolate(term, terms, spots)
+            self.pillars[date] = (
+                term, self.tape.record(_discounts, (term,), spot), spot
+            )
+
+    def interpolate(self, term, terms, slots):
+        """Same as `np.interp` at `term` on the values of `slots`"""
+        position = np.searchsorted(terms, term, side='right') - 1
+        if position < 0:
+            return slots[0]
+        if position == len(terms) - 1:
+            return slots[-1]
+        if terms[position] == term:
+            return slots[position]
+        return self.tape.record(
+            _interp,
+            (term, terms[position], terms[position + 1]),
+            slots[position],
+            slots[position + 1]
+        )
+
+    def futures(self, dates, slots):
+        """Same as `DiscountCurve.bootstrap_futures`"""
+        record = self.tape.record
+        dates = pd.DatetimeIndex(dates)
+        cursor = max(self.pillars)
+        resets = futures_reset(dates)
+        periods = np.asarray(self.daycounter(resets, dates).fraction())
+        growth = [record(_futures_growth, (period,), slot)
+                  for period, slot in zip(periods, slots)]
+        terms = self.terms(dates)
+
+        chained = np.zeros(len(dates), dtype=bool)
+        chained[1:] = resets[1:] == dates[:-1]
+        starts = np.flatnonzero(~chained)
+        for start, end in zip(starts, np.append(starts[1:], len(dates))):
+            self.fit([resets[start]])
+            row = self.pillars[pd.Timestamp(resets[start])][1]
+            product = growth[start]
+            for i in range(start, end):
+                if i > start:
+                    product = record(np.multiply, (), product, growth[i])
+                discount = record(np.divide, (), row, product)
+                self.pillars[dates[i]] = (
+                    terms[i], discount, record(_spots, (terms[i],), discount)
+                )
+
+        reset_dates = futures_resets(dates, cursor)
+        ranges = (reset_dates > cursor) & (reset_dates < dates[-1])
+        self.fit(reset_dates[ranges])
+
+    def swaps(self, dates, slots):
+        """Same as the iterative `DiscountCurve.bootstrap_swaps`: the rates
+        of the cash flow dates are interpolated swap after swap"""
+        record = self.tape.record
+        rates = dict(zip(dates, slots))
+        for date in dates:
+            cf_dates = swap_cashflow_dates([date], self.spot_date)
+            cf_dates.discard(self.spot_date)
+            cf_dates = [pd.Timestamp(cf_date) for cf_date in sorted(cf_dates)]
+            first_date = cf_dates[0]
+            for cf_date in cf_dates:
+                rates.setdefault(cf_date, None)
+
+            self.fit([first_date])
+            term = self.daycounter(self.spot_date, first_date).fraction()
+            rates[first_date] = record(_implied_rates, (term,),
+                                       self.pillars[first_date][1])
+            self.fill(rates)
+
+            discounts = []
+            previous_date, cumul = self.spot_date, self.zero
+            for cf_date in cf_dates:
+                diff = self.daycounter(previous_date, cf_date).fraction()
+                discount = record(_par_discounts, (diff,), cumul,
+                                  rates[cf_date])
+                cumul = record(_accrue, (diff,), cumul, discount)
+                discounts.append(discount)
+                previous_date = cf_date
+            self.merge(cf_dates, discounts)
+
+    def swap_grids(self, dates, slots):
+        """Same as the vectorized `DiscountCurve.bootstrap_swaps`: the rates
+        of all the cash flow dates are interpolated once"""
+        record = self.tape.record
+        grids = [[pd.Timestamp(cf_date) for cf_date in cf_dates]
+                 for cf_dates in _swap_grids(pd.DatetimeIndex(dates),
+                                             self.spot_date)]
+        first_dates = sorted({cf_dates[0] for cf_dates in grids})
+        self.fit(first_dates)
+
+        # First rates take priority over the quotes of the same date
+        rates = dict(zip(dates, slots))
+        for date, term in zip(first_dates, self.terms(first_dates)):
+            rates[date] = record(_implied_rates, (term,),
+                                 self.pillars[date][1])
+        for cf_dates in grids:
+            for cf_date in cf_dates:
+                rates.setdefault(cf_date, None)
+        self.fill(rates)
+
+        for cf_dates in grids:
+            diffs = self.daycounter([self.spot_date] + cf_dates[:-1],
+                                    cf_dates).fraction()
+            discounts = []
+            product = total = None
+            annuity = self.zero
+            for diff, cf_date in zip(np.asarray(diffs, dtype=np.float64),
+                                     cf_dates):
+                rate = rates[cf_date]
+                growth = record(_simple_discounts, (diff,), rate)
+                if product is None:
+                    product = growth
+                else:
+                    product = record(np.multiply, (), product, growth)
+                term = record(_annuity_terms, (diff,), growth, product)
+                if total is None:
+                    total = term
+                else:
+                    total = record(np.add, (), total, term)
+                discounts.append(record(_annuity_steps, (),
+                                        annuity, rate, growth))
+                annuity = record(np.multiply, (), product, total)
+            self.merge(cf_dates, discounts)
+
+    def fill(self, rates):
+        """Interpolates the missing swap `rates` on the known ones"""
+        missing = sorted(date for date, slot in rates.items() if slot is None)
+        if not missing:
+            return
+        known = sorted(date for date, slot in rates.items()
+                       if slot is not None)
+        terms = self.terms(known)
+        slots = [rates[date] for date in known]
+        for date, term in zip(missing, self.terms(missing)):
+            rates[date] = self.interpolate(term, terms, slots)
+
+    def merge(self, cf_dates, discounts):
+        """Same as merging swap discount factors into the curve: existing
+        discount factors are kept while the spot rates are replaced"""
+        for date, term, discount in zip(cf_dates, self.terms(cf_dates),
+                                        discounts):
+            spot = self.tape.record(_spots, (term,), discount)
+            if date in self.pillars:
+                term, discount, _ = self.pillars[date]
+            self.pillars[date] = (term, discount, spot)
+
+
+def _evaluate(function, args):
+    """Evaluates `function` on one element arrays, numpy rounding some
+    functions of arrays differently from the ones of scalars"""
+    return float(function(*(np.array([arg]) for arg in args))[0])
+
+
+def _interp(term, left_term, right_term, left, right):
+    return np.interp(term,
+                     np.concatenate([left_term, right_term]),
+                     np.concatenate([left, right]))
+
+
+def _fractions(daycounter, spot_date, dates):
+    return np.asarray(daycounter(spot_date, dates).fraction(),
+                      dtype=np.float64)
@@ -0,0 +1,213 @@
+"""
+Curve panel module: builds the term structures of many evaluation dates at
+once from a matrix of zero coupon rates.
+
+Each row of the panel gives the same values as the single date curve
+
+    curve = DiscountCurve.from_spots(rates, spot_date=date)
+    curve.fit_terms(query_maturities)
+
+read through `term_structure`, `to_spot()` and `to_forward()`.
+"""
+
+# pylint: disable=import-error
+
+import re
+
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from research.dates.daycounter import Actual360
+
+from .api import DiscountCurve
+
+
+def tenor_offset(tenor):
+    """Returns the pandas DateOffset corresponding to `tenor`
+
+    Parameters
+    ==========
+        tenor: str or pandas DateOffset
+            A number of days, weeks, months or years such as '1D', '2W',
+            '3M' or '10Y'.
+    """
+    if not isinstance(tenor, str):
+        return tenor
+
+    match = re.fullmatch(r'\s*(\d+)\s*([DWMY])\s*', tenor.upper())
+    if match is None:
+        raise ValueError(f'Unknown tenor {tenor}')
+
+    count, unit = int(match.group(1)), match.group(2)
+    units = {'D': 'days', 'W': 'weeks', 'M': 'months', 'Y': 'years'}
+    return pd.DateOffset(**{units[unit]: count})
+
+
+class CurvePanel:
+    """Creates the discount, spot and forward panels of a history of curves
+
+    Parameters
+    ==========
+
+        df_rates: pandas DataFrame with evaluation dates as index and tenors
+                  as columns
+            Contains zero coupon rates. Tenors are strings such as '3M' or
+            '10Y' or pandas DateOffset. Missing rates are NaN.
+
+        daycounter: fdates.daycounter class
+            The day count convention to be used : default (Act/360)
+
+        tenors: list like of tenors, optional
+            Additional tenors interpolated on every date, equivalent to
+            `DiscountCurve.fit_terms` on the corresponding maturities.
+
+        processes: int, optional
+            The number of worker processes. The panel is computed in the
+            current process by default.
+    """
+
+    def __init__(self,
+                 df_rates,
+                 daycounter=Actual360,
+                 tenors=None,
+                 processes=None):
+
+        self.daycounter = daycounter
+        self.spot_dates = pd.DatetimeIndex(df_rates.index)
+
+        columns = list(df_rates.columns)
+        query = [t for t in (tenors or []) if t not in columns]
+        self.tenors = pd.Index(columns + query)
+
+        rates = np.full((len(df_rates), len(self.tenors)), np.nan)
+        rates[:, :len(columns)] = df_rates.values
+        offsets = [tenor_offset(tenor) for tenor in self.tenors]
+        interpolate = len(query) > 0
+
+        if processes is None or processes <= 1:
+            blocks = [_build_block(rates, self.spot_dates, offsets,
+                                   daycounter, interpolate)]
+        else:
+            chunks = np.array_split(np.arange(len(rates)), processes)
+            chunks = [chunk for chunk in chunks if len(chunk)]
+            with ProcessPoolExecutor(max_workers=processes) as executor:
+                blocks = list(executor.map(
+                    _build_block,
+                    [rates[chunk] for chunk in chunks],
+                    [self.spot_dates[chunk] for chunk in chunks],
+                    [offsets] * len(chunks),
+                    [daycounter] * len(chunks),
+                    [interpolate] * len(chunks)
+                ))
+
+        maturities, terms, discounts, spots, forwards = (
+            np.concatenate(arrays) for arrays in zip(*blocks)
+        )
+        self.maturities = self.__frame(maturities)
+        self.terms = self.__frame(terms)
+        self.discounts = self.__frame(discounts)
+        self.spots = self.__frame(spots)
+        self.forwards = self.__frame(forwards)
+
+    @property
+    def term_structure(self):
+        """Returns the discount, spot and forward panels in a single
+        DataFrame with (kind, tenor) columns"""
+        return pd.concat({
+            'discount': self.discounts,
+            'spot': self.spots,
+            'forward': self.forwards
+        }, axis=1)
+
+    def curve(self, date):
+        """Returns the discount curve of the evaluation date `date`"""
+        date = pd.Timestamp(date)
+        discounts = pd.DataFrame(
+            self.discounts.loc[date].values,
+            index=pd.DatetimeIndex(self.maturities.loc[date].values),
+            columns=[date]
+        ).dropna()
+        return DiscountCurve(discounts, date, self.daycounter)
+
+    def __frame(self, values):
+        return pd.DataFrame(values, index=self.spot_dates, columns=self.tenors)
+
+
+def _build_block(rates, spot_dates, offsets, daycounter, interpolate):
+    """Computes the maturities, terms, discounts, spots and forwards of a
+    block of evaluation dates"""
+    nb_dates, nb_tenors = rates.shape
+    maturities = np.empty((nb_dates, nb_tenors), dtype='datetime64[ns]')
+    for j, offset in enumerate(offsets):
+        maturities[:, j] = (spot_dates + offset).values
+
+    # Year fractions of the whole block in a single day count call
+    starts = np.repeat(spot_dates.values, nb_tenors)
+    terms = daycounter(starts, maturities.ravel()).fraction()
+    terms = np.asarray(terms, dtype=np.float64).reshape(nb_dates, nb_tenors)
+
+    # Pillars are sorted by maturity on each date, quoted tenors first
+    order = np.argsort(terms, axis=1, kind='stable')
+    inverse = np.argsort(order, axis=1)
+    terms_ = np.take_along_axis(terms, order, axis=1)
+    rates_ = np.take_along_axis(rates, order, axis=1)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        discounts = 1 / (1 + rates_ * terms_)
+        spots = np.where(terms_ <= 1,
+                         (1 / discounts - 1) / terms_,
+                         (1 / discounts) ** (1 / terms_) - 1)
+
+        if interpolate:
+            spots = _interpolate_rows(terms_, spots)
+            fitted = np.where(terms_ <= 1,
+                              1 / (1 + spots * terms_),
+                              1 / ((1 + spots) ** terms_))
+            discounts = np.where(np.isnan(discounts), fitted, discounts)
+
+        diff = np.diff(terms_, axis=1)
+        forwards = np.empty_like(discounts)
+        forwards[:, 0] = (1 / discounts[:, 0] - 1) / terms_[:, 0]
+        forwards[:, 1:] = (discounts[:, :-1] / discounts[:, 1:] - 1) / diff
+
+    return (
+        maturities,
+        terms,
+        np.take_along_axis(discounts, inverse, axis=1),
+        np.take_along_axis(spots, inverse, axis=1),
+        np.take_along_axis(forwards, inverse, axis=1)
+    )
+
+
+def _interpolate_rows(terms, values):
+    """Linear interpolation of the missing values of each row on the year
+    fractions, flat outside the available range. The interpolation brackets
+    of all the rows are found at once and the arithmetic follows `np.interp`
+    so that the results match the single curve interpolation.
+    """
+    missing = np.isnan(values)
+    positions = np.arange(values.shape[1])
+
+    left = np.where(missing, -1, positions)
+    left = np.maximum.accumulate(left, axis=1)
+    right = np.where(missing, values.shape[1], positions)
+    right = np.minimum.accumulate(right[:, ::-1], axis=1)[:, ::-1]
+
+    has_left, has_right = left >= 0, right < values.shape[1]
+    left = np.where(has_left, left, right)
+    right = np.where(has_right, right, left)
+    left = np.minimum(left, values.shape[1] - 1)
+    right = np.minimum(right, values.shape[1] - 1)
+
+    x_left = np.take_along_axis(terms, left, axis=1)
+    x_right = np.take_along_axis(terms, right, axis=1)
+    y_left = np.take_along_axis(values, left, axis=1)
+    y_right = np.take_along_axis(values, right, axis=1)
+
+    slope = (y_right - y_left) / (x_right - x_left)
+    inner = slope * (terms - x_left) + y_left
+    filled = np.where(has_left & has_right, inner,
+                      np.where(has_left, y_left, y_right))
+    return np.where(missing, filled, values)
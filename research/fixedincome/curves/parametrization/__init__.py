@@ -1 +1,13 @@
+from .nelson_siegel import (
+    BjorkChristensen, Bliss, NelsonSiegel, NelsonSiegelFamily, evaluate_all
+)
+from .parametrization import EvaluationGrid
+from .spline import MonotoneConvex, SmoothingSpline
 from .svensson import Svensson
+
+MODELS = {
+    'nelson_siegel': NelsonSiegel,
+    'bliss': Bliss,
+    'bjork_christensen': BjorkChristensen,
+    'svensson': Svensson
+}
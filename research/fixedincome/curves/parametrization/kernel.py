@@ -0,0 +1,99 @@
+"""
+Exponential kernel shared by the Nelson-Siegel family of parametrizations.
+
+With x = theta / tau, the forward and spot loadings of the factors are
+
+    level:      1               1
+    slope:      exp(-x)         (1 - exp(-x)) / x
+    curvature:  x exp(-x)       (1 - exp(-x)) / x - exp(-x)
+    double:     exp(-2x)        (1 - exp(-2x)) / (2x)
+
+exp(-x) and (1 - exp(-x)) / x are computed once per tau and reused by the
+forward, spot, derivative and tau sensitivity of every factor, so that all
+the models evaluated on the same terms share them.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+FACTORS = ('level', 'slope', 'curvature', 'double')
+
+# Forward and spot loadings, derivative of the forward loading with respect
+# to the term and sensitivity of the forward loading with respect to tau
+Loadings = namedtuple('Loadings',
+                      ['forward', 'spot', 'derivative', 'sensitivity'])
+
+
+class ExponentialKernel:
+    """Caches the exponential factors of the terms `theta` by tau
+
+    Parameters
+    ==========
+        theta: numpy array
+            The terms to maturity
+
+        maxsize: int, optional
+            The number of taus kept in cache, the oldest are dropped first.
+            Unbounded by default.
+    """
+
+    def __init__(self, theta, maxsize=None):
+        self.theta = np.asarray(theta, dtype=np.float64)
+        self.maxsize = maxsize
+        self.__decays = {}
+        self.__loadings = {}
+
+    def decay(self, tau):
+        """Returns x, exp(-x) and (1 - exp(-x)) / x with x = theta / tau"""
+        key = _key(tau)
+        if key not in self.__decays:
+            ratio = self.theta / tau
+            self.__decays[key] = (ratio, np.exp(-ratio), _ratio(ratio))
+            self.__evict(self.__decays, 1)
+        return self.__decays[key]
+
+    def loadings(self, factor, tau=None):
+        """Returns the `Loadings` of `factor`, the level has no tau"""
+        assert factor in FACTORS
+        key = (factor, _key(tau))
+        if key not in self.__loadings:
+            self.__loadings[key] = self.__compute(factor, tau)
+            self.__evict(self.__loadings, len(FACTORS))
+        return self.__loadings[key]
+
+    def __evict(self, cache, per_tau):
+        if self.maxsize is not None and len(cache) > per_tau * self.maxsize:
+            del cache[next(iter(cache))]
+
+    def __compute(self, factor, tau):
+        if factor == 'level':
+            ones = np.ones_like(self.theta)
+            zeros = np.zeros_like(self.theta)
+            return Loadings(ones, ones, zeros, zeros)
+
+        x, exp, ratio = self.decay(tau)
+        if factor == 'slope':
+            return Loadings(exp, ratio, -exp / tau, x * exp / tau)
+        if factor == 'curvature':
+            return Loadings(x * exp,
+                            ratio - exp,
+                            (1 - x) * exp / tau,
+                            (x - 1) * x * exp / tau)
+        exp_2 = exp ** 2
+        return Loadings(exp_2,
+                        ratio * (1 + exp) / 2,
+                        -2 * exp_2 / tau,
+                        2 * x * exp_2 / tau)
+
+
+def _key(tau):
+    if tau is None or np.ndim(tau) == 0:
+        return tau if tau is None else float(tau)
+    tau = np.asarray(tau, dtype=np.float64)
+    return tau.shape, tau.tobytes()
+
+
+def _ratio(x):
+    """(1 - exp(-x)) / x with its limit 1 at x = 0"""
+    return np.divide(-np.expm1(-x), x, out=np.ones_like(x), where=x != 0)
@@ -0,0 +1,170 @@
+import numpy as np
+
+from .kernel import ExponentialKernel
+from .parametrization import Parametrization, Surfaces
+
+
+class NelsonSiegelFamily(Parametrization):
+    """Parametrizations whose instantaneous forward curve is a linear
+    combination of the exponential factors of `ExponentialKernel`.
+
+    The parameters are the betas, one per factor, followed by the taus.
+    """
+
+    # (factor, position of its tau) of each beta, the level has no tau
+    factors = ()
+
+    def __init__(self, *params):
+        super().__init__()
+        self.params = np.zeros(self.nb_params)
+        self.params[:len(params)] = params
+
+    @property
+    def nb_betas(self):
+        return len(self.factors)
+
+    def instantaneous_forward_curve(self, theta):
+        return self._combine(ExponentialKernel(theta), self.params, 'forward')
+
+    def ifr_derivative(self, theta):
+        return self._combine(ExponentialKernel(theta), self.params,
+                             'derivative')
+
+    def spot_curve(self, theta):
+        return self._combine(ExponentialKernel(theta), self.params, 'spot')
+
+    def discount_curve(self, theta):
+        return self.evaluate(theta).discount
+
+    def jacobian(self, theta):
+        return self.__jacobian(theta, 'forward')
+
+    def spot_jacobian(self, theta):
+        return self.__jacobian(theta, 'spot')
+
+    def __jacobian(self, theta, field):
+        kernel = ExponentialKernel(theta)
+        betas = self.params[:self.nb_betas]
+        taus = self.params[self.nb_betas:]
+        columns = [np.zeros_like(kernel.theta) for _ in self.param_names]
+        for i, (factor, position) in enumerate(self.factors):
+            tau = None if position is None else taus[position]
+            loadings = kernel.loadings(factor, tau)
+            columns[i] = columns[i] + getattr(loadings, field)
+            if position is not None:
+                # The spot loading is the average of the forward loading
+                # over [0, theta], its derivative with respect to tau is
+                # (spot - forward) / tau
+                sensitivity = loadings.sensitivity if field == 'forward' \
+                    else (loadings.spot - loadings.forward) / tau
+                columns[self.nb_betas + position] = (
+                    columns[self.nb_betas + position] + betas[i] * sensitivity
+                )
+        return np.stack(columns, axis=-1)
+
+    def evaluate(self, theta):
+        """Returns the forward, spot, discount and forward derivative curves
+        on the terms `theta`, the terms of an `ExponentialKernel` or of an
+        `EvaluationGrid`"""
+        kernel = _as_kernel(theta)
+        return self._surfaces(kernel, self.params)
+
+    @classmethod
+    def surfaces(cls, params, theta):
+        """Evaluates many parameter sets on the same terms at once
+
+        Parameters
+        ==========
+            params: numpy array (dates x parameters)
+                The parameters of each date, in the order of `param_names`
+
+            theta: numpy array, ExponentialKernel or EvaluationGrid
+                The terms to maturity
+
+        Returns the (dates x terms) forward, spot, discount and forward
+        derivative surfaces. The spot rate at term 0 is its limit and the
+        discount factor is 1.
+        """
+        params = np.atleast_2d(np.asarray(params, dtype=np.float64))
+        return cls._surfaces(_as_kernel(theta, flat=True), params)
+
+    @classmethod
+    def _surfaces(cls, kernel, params):
+        forward, spot, derivative = (
+            cls._combine(kernel, params, field)
+            for field in ('forward', 'spot', 'derivative')
+        )
+        discount = np.exp(-kernel.theta * spot / 100)
+        return Surfaces(forward, spot, discount, derivative)
+
+    @classmethod
+    def _combine(cls, kernel, params, field):
+        """Sums the `field` loadings of the factors weighted by the betas,
+        params of shape (dates x parameters) give (dates x terms) values"""
+        if params.ndim == 2:
+            params = params.T[:, :, np.newaxis]
+        betas = params[:len(cls.factors)]
+        taus = params[len(cls.factors):]
+
+        values = 0
+        for beta, (factor, position) in zip(betas, cls.factors):
+            tau = None if position is None else taus[position]
+            loadings = kernel.loadings(factor, tau)
+            values = values + beta * getattr(loadings, field)
+        return values
+
+    def _update_params(self, args):
+        self.params = np.array(args, dtype=np.float64)
+
+    def __repr__(self):
+        lines = [f'{type(self).__name__} curve parametrization:']
+        lines += [
+            f'{name} = {value}'
+            for name, value in zip(self.param_names, self.params)
+        ]
+        return '\n        '.join([''] + lines) + '\n        '
+
+
+class NelsonSiegel(NelsonSiegelFamily):
+
+    param_names = ('beta_0', 'beta_1', 'beta_2', 'tau_1')
+    factors = (('level', None), ('slope', 0), ('curvature', 0))
+
+    def __init__(self, beta_0=0, beta_1=0, beta_2=0, tau_1=0):
+        super().__init__(beta_0, beta_1, beta_2, tau_1)
+
+
+class Bliss(NelsonSiegelFamily):
+
+    param_names = ('beta_0', 'beta_1', 'beta_2', 'tau_1', 'tau_2')
+    factors = (('level', None), ('slope', 0), ('curvature', 1))
+
+    def __init__(self, beta_0=0, beta_1=0, beta_2=0, tau_1=0, tau_2=0):
+        super().__init__(beta_0, beta_1, beta_2, tau_1, tau_2)
+
+
+class BjorkChristensen(NelsonSiegelFamily):
+
+    param_names = ('beta_0', 'beta_1', 'beta_2', 'beta_3', 'tau_1')
+    factors = (('level', None), ('slope', 0), ('curvature', 0),
+               ('double', 0))
+
+    def __init__(self, beta_0=0, beta_1=0, beta_2=0, beta_3=0, tau_1=0):
+        super().__init__(beta_0, beta_1, beta_2, beta_3, tau_1)
+
+
+def evaluate_all(models, theta):
+    """Evaluates `models` on the same terms, sharing the exponential factors
+    of equal taus, returns the list of their `Surfaces`"""
+    kernel = _as_kernel(theta)
+    return [model.evaluate(kernel) for model in models]
+
+
+def _as_kernel(theta, flat=False):
+    if isinstance(theta, ExponentialKernel):
+        return theta
+    if hasattr(theta, 'kernel'):
+        return theta.kernel
+    if flat:
+        theta = np.ravel(np.asarray(theta, dtype=np.float64))
+    return ExponentialKernel(theta)
@@ -1,11 +1,82 @@
+import multiprocessing
+import time
+
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import matplotlib.pyplot as plt
 import numpy as np
+import pandas as pd
 
+from scipy import sparse
 from scipy.optimize import minimize
 
+from research.fixedincome.cashflow.cashflows import PackedAmounts, pack_amounts
+
+from .kernel import ExponentialKernel
+
+CalibrationResult = namedtuple('CalibrationResult', [
+    'params',          # optimal parameters
+    'value',           # objective at the optimal parameters
+    'optima',          # parameters found by each start, best first
+    'values',          # objective of each start, best first
+    'nb_evaluations',  # objective evaluations of each start, best first
+    'durations',       # seconds spent by each start, best first
+    'elapsed',         # wall clock seconds of the whole calibration
+    'converged'        # whether the tolerance was reached
+])
+
+Surfaces = namedtuple('Surfaces', [
+    'forward',
+    'spot',
+    'discount',
+    'derivative'
+])
+
+
+class EvaluationGrid:
+    """Terms to maturity reused by the plots and exports of
+    parametrizations, the exponential factors of the Nelson-Siegel family
+    are cached by tau for the last `maxsize` taus
+
+    Parameters
+    ==========
+        start, stop, num: float, float, int
+            The evenly spaced terms to maturity, as in `numpy.linspace`
+
+        maxsize: int
+            The number of taus kept in cache
+    """
+
+    def __init__(self, start=0, stop=30, num=1000, maxsize=64):
+        self.theta = np.linspace(start, stop, num)
+        self.kernel = ExponentialKernel(self.theta, maxsize)
+
+    def evaluate(self, parametrization):
+        """Returns the `Surfaces` of `parametrization` on the grid"""
+        return parametrization.evaluate(self)
+
+    def export(self, parametrizations):
+        """Returns the forward, spot and discount curves of
+        `parametrizations` on the grid as a (parametrizations x 3 x terms)
+        float32 array"""
+        return np.stack([
+            parametrization.export(self)
+            for parametrization in parametrizations
+        ])
+
 
 class Parametrization:
 
+    param_names = ()
+
+    # Default grid of the plots and exports, shared by all the instances
+    grid = EvaluationGrid()
+
+    @property
+    def nb_params(self):
+        return len(self.param_names)
+
     def instantaneous_forward_curve(self, theta):
         raise NotImplementedError()
 
@@ -18,52 +89,267 @@ class Parametrization:
     def spot_curve(self, theta):
         raise NotImplementedError()
 
+    def jacobian(self, theta):
+        """Derivatives of the instantaneous forward rates with respect to the
+        parameters, one row per term and one column per parameter"""
+        raise NotImplementedError()
+
     def _update_params(self, args):
         raise NotImplementedError()
 
-    def plot_forward(self, **kwargs):
-        theta = np.linspace(0, 30, 1000)
-        plt.plot(theta, self.instantaneous_forward_curve(theta), **kwargs)
+    def evaluate(self, theta):
+        """Returns the forward, spot, discount and forward derivative curves
+        on the terms `theta` or on the terms of an `EvaluationGrid`"""
+        theta = getattr(theta, 'theta', theta)
+        return Surfaces(self.instantaneous_forward_curve(theta),
+                        self.spot_curve(theta),
+                        self.discount_curve(theta),
+                        self.ifr_derivative(theta))
+
+    def export(self, grid=None):
+        """Returns the forward, spot and discount curves on `grid` (the
+        shared `grid` by default) as a (3 x terms) float32 array"""
+        surfaces = self.evaluate(self.grid if grid is None else grid)
+        return np.array(surfaces[:3], dtype=np.float32)
+
+    def plot_forward(self, grid=None, **kwargs):
+        grid = self.grid if grid is None else grid
+        plt.plot(grid.theta, self.evaluate(grid).forward, **kwargs)
         plt.xlabel('Term to maturity')
         plt.ylabel('Instantaneous forward rates')
-        plt.title('Svensson parametrization of instantaneous forward rates')
+        plt.title(f'{self.__class__.__name__} parametrization of '
+                  'instantaneous forward rates')
 
-    def plot_spot(self, **kwargs):
-        theta = np.linspace(0.00274, 30, 1000)
-        plt.plot(theta, self.spot_curve(theta), **kwargs)
+    def plot_spot(self, grid=None, **kwargs):
+        grid = self.grid if grid is None else grid
+        plt.plot(grid.theta, self.evaluate(grid).spot, **kwargs)
         plt.xlabel('Term to maturity')
         plt.ylabel('Spot rates')
-        plt.title('Svensson parametrization of spot rates')
+        plt.title(f'{self.__class__.__name__} parametrization of spot rates')
 
-    def plot_discount(self, **kwargs):
-        theta = np.linspace(0.00274, 30, 1000)
-        plt.plot(theta, self.discount_curve(theta), **kwargs)
+    def plot_discount(self, grid=None, **kwargs):
+        grid = self.grid if grid is None else grid
+        plt.plot(grid.theta, self.evaluate(grid).discount, **kwargs)
         plt.xlabel('Term to maturity')
         plt.ylabel('discount rates')
-        plt.title('Svensson parametrization of the discount curve')
+        plt.title(f'{self.__class__.__name__} parametrization of the '
+                  'discount curve')
+
+    def spot_jacobian(self, theta):
+        """Derivatives of the spot rates with respect to the parameters, one
+        row per term and one column per parameter"""
+        raise NotImplementedError()
 
     def _objective(self, params, times, rates):
+        """Sum of squared errors on the forward rates and its gradient"""
+        self._update_params(params)
+        residuals = rates - self.instantaneous_forward_curve(times)
+        gradient = -2 * residuals @ self.jacobian(times)
+        return np.power(residuals, 2).sum(), gradient
+
+    def _price_objective(self, params, cashflows, prices):
+        """Sum of squared errors on the clean prices and its gradient"""
         self._update_params(params)
-        estimates = self.instantaneous_forward_curve(times)
-        return np.power(rates - estimates, 2).sum()
-
-    def calibrate(self, times, rates, nb_trials=100):
-        value = np.inf
-        optimal_params = None
-        options = {'ftol': 1e-8, 'maxiter': 5000}
-        for i in range(1, nb_trials+1):
-            print(f'\rCalibrating: iter = {i}', end='')
-            params = 3 * np.random.rand(6)
-            res = minimize(self._objective,
-                           params,
-                           method='L-BFGS-B',
-                           options=options,
-                           args=(times, rates))
-
-            if res.fun < value:
-                value = res.fun
-                optimal_params = res.x
-            if value < 1e-8:
-                print(f'\nOptimal parameters found after {i} iterations')
-                break
-        self._update_params(optimal_params)
+        times = cashflows.times
+        discounts = np.exp(-times * self.spot_curve(times) / 100)
+        sensitivities = (
+            -(times * discounts / 100)[:, np.newaxis]
+            * self.spot_jacobian(times)
+        )
+        # The accrued interest has a negative sign
+        residuals = prices - (cashflows.matrix @ discounts + cashflows.accrued)
+        gradient = -2 * residuals @ (cashflows.matrix @ sensitivities)
+        return np.power(residuals, 2).sum(), gradient
+
+    def calibrate(self, times, rates, nb_trials=100, tol=1e-8,
+                  processes=None, seed=None):
+        """Fits the instantaneous forward rates `rates` observed at `times`
+        with L-BFGS-B started from `nb_trials` random points. The search
+        stops as soon as a start reaches `tol`. Starts run in `processes`
+        worker processes, in the current process by default.
+
+        The optimal parameters are set on the instance and the
+        `CalibrationResult` of all the starts is returned.
+        """
+        times = np.asarray(times, dtype=np.float64)
+        rates = np.asarray(rates, dtype=np.float64)
+        return self._multistart(self._objective, (times, rates), nb_trials,
+                                tol, processes, seed)
+
+    def calibrate_prices(self, bonds, prices, nb_trials=100, tol=1e-8,
+                         processes=None, seed=None):
+        """Fits the clean prices `prices` of `bonds` like `calibrate`
+
+        The future cash flows of all the bonds are packed once by
+        `pack_amounts`, the discount curve is evaluated on their unique
+        times and each bond is priced by a segmented sum over its cash
+        flows.
+
+        Parameters
+        ==========
+            bonds: list of Bond or PackedAmounts
+                The bonds, sharing the same settlement date
+
+            prices: numpy array
+                The clean price of each bond
+        """
+        if not isinstance(bonds, PackedAmounts):
+            bonds = pack_amounts(bonds)
+        cashflows = _PricedCashflows(bonds)
+        prices = np.asarray(prices, dtype=np.float64)
+        return self._multistart(self._price_objective, (cashflows, prices),
+                                nb_trials, tol, processes, seed)
+
+    def _multistart(self, objective, args, nb_trials, tol, processes, seed):
+        starts = 3 * np.random.default_rng(seed).random(
+            (nb_trials, self.nb_params))
+
+        started = time.perf_counter()
+        runs = []
+        if processes is None or processes <= 1:
+            for start in starts:
+                runs.append(_minimize(objective, start, args))
+                if runs[-1][1] < tol:
+                    break
+        else:
+            # The pool is not left through a with block, whose exit would
+            # wait for the running starts: they stop at their next iteration
+            # once the event is set and the pending ones are cancelled
+            stop = multiprocessing.Event()
+            executor = ProcessPoolExecutor(max_workers=processes,
+                                           initializer=_set_stop_event,
+                                           initargs=(stop,))
+            try:
+                futures = [
+                    executor.submit(_minimize, objective, start, args)
+                    for start in starts
+                ]
+                for future in as_completed(futures):
+                    runs.append(future.result())
+                    if runs[-1][1] < tol:
+                        break
+            finally:
+                stop.set()
+                executor.shutdown(wait=False, cancel_futures=True)
+        elapsed = time.perf_counter() - started
+
+        optima, values, nb_evaluations, durations = (
+            np.array(column) for column in zip(*runs)
+        )
+        order = np.argsort(np.where(np.isnan(values), np.inf, values),
+                           kind='stable')
+        self._update_params(optima[order[0]])
+        return CalibrationResult(
+            params=optima[order[0]],
+            value=values[order[0]],
+            optima=optima[order],
+            values=values[order],
+            nb_evaluations=nb_evaluations[order],
+            durations=durations[order],
+            elapsed=elapsed,
+            converged=bool(values[order[0]] < tol)
+        )
+
+    def iter_history(self, df_rates, threshold=1e-2, nb_trials=100,
+                     processes=None, seed=None):
+        """Calibrates a history of forward curves date after date, yielding
+        the date, the optimal parameters, the root mean squared error and
+        whether the warm start was kept.
+
+        Each date starts from the optimum of the previous date and falls back
+        to the multi-start `calibrate` when the root mean squared error of
+        the warm started fit is above `threshold`. The first date is always
+        calibrated with multiple starts.
+
+        Parameters
+        ==========
+            df_rates: pandas DataFrame with dates as index and terms to
+                      maturity as columns
+                The instantaneous forward rates of each date, missing rates
+                are ignored
+        """
+        rng = np.random.default_rng(seed)
+        terms = np.asarray(df_rates.columns, dtype=np.float64)
+        params = None
+        for date, row in zip(df_rates.index, df_rates.values):
+            valid = ~np.isnan(row)
+            times, rates = terms[valid], row[valid]
+
+            warm = params is not None
+            if warm:
+                params, value, _, _ = _minimize(self._objective, params,
+                                                (times, rates))
+                warm = _rmse(value, times) <= threshold
+            if not warm:
+                result = self.calibrate(times, rates, nb_trials=nb_trials,
+                                        processes=processes, seed=rng)
+                if params is None or not value <= result.value:
+                    params, value = result.params, result.value
+
+            self._update_params(params)
+            yield date, params, _rmse(value, times), warm
+
+    def calibrate_history(self, df_rates, threshold=1e-2, nb_trials=100,
+                          processes=None, seed=None):
+        """Returns the history of the parameters calibrated by
+        `iter_history` as a DataFrame with dates as index, one column per
+        parameter plus the 'rmse' and 'warm_start' columns"""
+        history = self.iter_history(df_rates, threshold, nb_trials,
+                                    processes, seed)
+        rows = {
+            date: (*params, rmse, warm)
+            for date, params, rmse, warm in history
+        }
+        return pd.DataFrame.from_dict(
+            rows,
+            orient='index',
+            columns=[*self.param_names, 'rmse', 'warm_start']
+        )
+
+
+def _rmse(value, times):
+    return np.sqrt(value / len(times))
+
+
+class _PricedCashflows:
+    """Cash flows of packed bonds on their unique times, as a sparse
+    (bonds x times) matrix whose product with the discount factors sums the
+    discounted cash flows of each bond"""
+
+    def __init__(self, packed):
+        self.times, positions = np.unique(packed.times, return_inverse=True)
+        self.matrix = sparse.csr_matrix(
+            (packed.amounts, (packed.bond_ids, positions)),
+            shape=(len(packed.accrued), len(self.times))
+        )
+        self.accrued = packed.accrued
+
+
+# Event set by the parent process to stop the starts of a pool worker
+_STOP_EVENT = None
+
+
+def _set_stop_event(event):
+    """Initializer of the pool workers"""
+    global _STOP_EVENT  # pylint: disable=global-statement
+    _STOP_EVENT = event
+
+
+def _check_stop(*_):
+    """L-BFGS-B callback ending the start once the stop event is set"""
+    if _STOP_EVENT is not None and _STOP_EVENT.is_set():
+        raise StopIteration
+
+
+def _minimize(objective, start, args):
+    """Runs a single L-BFGS-B start, returns the optimum, the objective, the
+    number of evaluations and the duration"""
+    started = time.perf_counter()
+    res = minimize(objective,
+                   start,
+                   method='L-BFGS-B',
+                   jac=True,
+                   options={'ftol': 1e-8, 'maxiter': 5000},
+                   callback=_check_stop,
+                   args=args)
+    return res.x, res.fun, res.nfev, time.perf_counter() - started
@@ -0,0 +1,229 @@
+"""
+Non parametric curves: penalized B-splines on the log of the discount
+factors and Hagan & West monotone convex interpolation of zero rates.
+
+Rates are continuously compounded and in percent, like the Nelson-Siegel
+family, so that `DiscountCurve.from_parametrization` accepts any of them.
+"""
+
+import time
+
+import numpy as np
+
+from scipy import linalg, sparse
+from scipy.interpolate import BSpline
+
+from ..interpolation import interpolate_terms, monotone_convex_forwards
+from .parametrization import CalibrationResult, Parametrization
+
+
+class SmoothingSpline(Parametrization):
+    """Penalized B-spline (P-spline) of the log of the discount factors
+
+    log P(theta) = sum_j c_j B_j(theta) with c_0 = 0 so that P(0) = 1. The
+    coefficients minimize the weighted squared errors plus `smoothing` times
+    the squared second differences of the coefficients. The normal equations
+    are banded, their cost is linear in the number of knots. The forward
+    rate is flat after the last knot.
+
+    Parameters
+    ==========
+        knots: numpy array
+            The increasing terms of the knots, starting at 0
+
+        smoothing: float
+            The weight of the roughness penalty
+
+        degree: int
+            The degree of the B-splines : default 3 (cubic)
+    """
+
+    def __init__(self, knots, smoothing=1e-6, degree=3):
+        super().__init__()
+        knots = np.asarray(knots, dtype=np.float64)
+        assert knots[0] == 0 and np.all(np.diff(knots) > 0)
+        self.degree = degree
+        self.smoothing = smoothing
+        self.knots = np.concatenate([
+            np.repeat(knots[0], degree), knots, np.repeat(knots[-1], degree)
+        ])
+        self.params = np.zeros(len(self.knots) - degree - 2)
+
+    @property
+    def param_names(self):
+        return tuple(f'c_{i}' for i in range(1, len(self.params) + 1))
+
+    def instantaneous_forward_curve(self, theta):
+        return -100 * self.__log_discount(theta, 1)
+
+    def ifr_derivative(self, theta):
+        return -100 * self.__log_discount(theta, 2)
+
+    def spot_curve(self, theta):
+        theta = np.asarray(theta, dtype=np.float64)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            spots = -100 * self.__log_discount(theta) / theta
+        return np.where(theta == 0, self.instantaneous_forward_curve(0),
+                        spots)[()]
+
+    def discount_curve(self, theta):
+        return np.exp(self.__log_discount(theta))
+
+    def jacobian(self, theta):
+        return -100 * self.__design(theta, 1).toarray()
+
+    def spot_jacobian(self, theta):
+        theta = np.atleast_1d(np.asarray(theta, dtype=np.float64))
+        at_spot = theta == 0
+        # The limit at the spot date is the forward design row
+        design = np.divide(self.__design(theta, 0).toarray(),
+                           theta[:, np.newaxis],
+                           out=np.zeros((len(theta), len(self.params))),
+                           where=~at_spot[:, np.newaxis])
+        if at_spot.any():
+            design[at_spot] = self.__design(theta[at_spot], 1).toarray()
+        return -100 * design
+
+    def fit(self, times, discounts, weights=None):
+        """Fits the discount factors `discounts` observed at `times`"""
+        self.__solve(self.__design(times, 0), np.log(discounts), weights)
+        return self
+
+    def calibrate(self, times, rates, weights=None, **kwargs):
+        """Fits the instantaneous forward rates `rates` observed at `times`
+        with a single banded solve, the multi-start options of
+        `Parametrization.calibrate` are ignored"""
+        started = time.perf_counter()
+        rates = np.asarray(rates, dtype=np.float64)
+        self.__solve(self.__design(times, 1), -rates / 100, weights)
+        value = np.power(rates - self.instantaneous_forward_curve(times),
+                         2).sum()
+        elapsed = time.perf_counter() - started
+        return CalibrationResult(
+            params=self.params,
+            value=value,
+            optima=self.params[np.newaxis],
+            values=np.array([value]),
+            nb_evaluations=np.array([1]),
+            durations=np.array([elapsed]),
+            elapsed=elapsed,
+            converged=True
+        )
+
+    def _update_params(self, args):
+        self.params = np.array(args, dtype=np.float64)
+
+    def __log_discount(self, theta, nu=0):
+        """Derivative of order `nu` of the log discount factors, linear after
+        the last knot"""
+        theta = np.asarray(theta, dtype=np.float64)
+        last = self.knots[-1]
+        spline = BSpline(self.knots,
+                         np.concatenate([[0.], self.params]),
+                         self.degree)
+        values = spline(np.clip(theta, 0, last), nu)
+        after = theta > last
+        if nu == 0:
+            values = values + np.where(after, spline(last, 1), 0) * (
+                theta - last)
+        elif nu > 1:
+            values = np.where(after, 0, values)
+        return values[()]
+
+    def __design(self, times, nu):
+        """Sparse (times x coefficients) matrix of the B-splines derivatives
+        of order `nu` (0 or 1) at `times`, without the fixed c_0"""
+        times = np.atleast_1d(np.asarray(times, dtype=np.float64))
+        assert times.max() <= self.knots[-1]
+        if nu == 0:
+            design = BSpline.design_matrix(times, self.knots, self.degree)
+        else:
+            # The derivative of a spline is a spline of degree k - 1 whose
+            # coefficients are scaled differences of the coefficients
+            knots, degree = self.knots[1:-1], self.degree - 1
+            size = len(self.knots) - self.degree - 1
+            scale = self.degree / (
+                self.knots[self.degree + 1:self.degree + size]
+                - self.knots[1:size]
+            )
+            differences = sparse.diags([-scale, scale], [0, 1],
+                                       shape=(size - 1, size))
+            design = BSpline.design_matrix(times, knots, degree) @ differences
+        return sparse.csr_matrix(design)[:, 1:]
+
+    def __solve(self, design, targets, weights):
+        size = design.shape[1] + 1
+        if weights is None:
+            weights = np.ones(design.shape[0])
+        penalty = sparse.diags([1., -2., 1.], [0, 1, 2],
+                               shape=(size - 2, size)).tocsc()[:, 1:]
+        weighted = design.T.multiply(weights).tocsr()
+        normal = (weighted @ design + self.smoothing * (penalty.T @ penalty))
+        bandwidth = max(self.degree, 2)
+        self.params = _solve_banded(normal.todia(), weighted @ targets,
+                                    bandwidth)
+
+
+class MonotoneConvex(Parametrization):
+    """Hagan & West monotone convex interpolation of zero rates, flat after
+    the last pillar
+
+    Parameters
+    ==========
+        terms: numpy array
+            The increasing terms of the pillars
+
+        rates: numpy array
+            The continuously compounded zero rates of the pillars in percent
+    """
+
+    def __init__(self, terms=(1.,), rates=(0.,)):
+        super().__init__()
+        self.terms = np.asarray(terms, dtype=np.float64)
+        self.params = np.asarray(rates, dtype=np.float64)
+
+    @property
+    def param_names(self):
+        return tuple(f'rate_{i}' for i in range(1, len(self.params) + 1))
+
+    def instantaneous_forward_curve(self, theta):
+        return self.__evaluate(theta, lambda query: monotone_convex_forwards(
+            self.terms, self.params, query)[0])
+
+    def ifr_derivative(self, theta):
+        return self.__evaluate(theta, lambda query: monotone_convex_forwards(
+            self.terms, self.params, query)[1])
+
+    def spot_curve(self, theta):
+        return self.__evaluate(theta, lambda query: interpolate_terms(
+            self.terms, self.params, query, 'monotone_convex'))
+
+    def discount_curve(self, theta):
+        return np.exp(-np.asarray(theta) * self.spot_curve(theta) / 100)
+
+    def fit(self, times, discounts):
+        """Uses the discount factors `discounts` observed at `times` as the
+        pillars"""
+        times = np.asarray(times, dtype=np.float64)
+        order = np.argsort(times)
+        self.terms = times[order]
+        self.params = -100 * np.log(np.asarray(discounts)[order]) / self.terms
+        return self
+
+    def _update_params(self, args):
+        self.params = np.array(args, dtype=np.float64)
+
+    @staticmethod
+    def __evaluate(theta, function):
+        shape = np.shape(theta)
+        return function(np.ravel(np.asarray(theta, dtype=np.float64))
+                        ).reshape(shape)[()]
+
+
+def _solve_banded(normal, rhs, bandwidth):
+    """Solves the symmetric positive definite banded system `normal`"""
+    size = normal.shape[0]
+    banded = np.zeros((bandwidth + 1, size))
+    for offset in range(bandwidth + 1):
+        banded[bandwidth - offset, offset:] = normal.diagonal(offset)
+    return linalg.solveh_banded(banded, rhs)
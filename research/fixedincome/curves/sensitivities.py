@@ -0,0 +1,177 @@
+"""
+Key rate sensitivities of bootstrapped discount curves.
+
+Each input pillar of the curve (spot, futures and swap rates) is bumped and
+the curve is rebootstrapped from the stage of the bumped pillar onwards:
+the curve built by the previous stages is reused as is. All the pillars of
+a stage are bumped at once, one column of a multi column curve per bump, so
+that the bumped discount factors come out as a single matrix.
+"""
+
+# pylint: disable=import-error
+
+import copy
+
+import numpy as np
+import pandas as pd
+
+from research.dates.daycounter import Actual360
+from research.dates.utils import today
+
+from ._generic import CashflowMatrix
+from ._staged import _StagedCurve
+from .api import DiscountCurve
+
+
+class CurveSensitivities:
+    """Creates the key rate sensitivities engine of a discount curve
+
+    Parameters
+    ==========
+
+        df_spots: pandas DataFrame or Series with maturities as index
+            The zero coupon rates the curve starts from
+
+        df_futures: pandas DataFrame or Series with maturities as index
+            The futures rates bootstrapped after the spot rates
+
+        df_swaps: pandas DataFrame or Series with maturities as index
+            The swap rates bootstrapped last
+
+        spot_date: datetime
+            the evaluation date
+
+        daycounter: fdates.daycounter class
+            The day count convention to be used : default (Act/360)
+
+        bump: float
+            The shift applied to each input rate : default 1bp
+
+        method: str, one of ('iterative', 'vectorized')
+            The swap bootstrap method, see `DiscountCurve.bootstrap_swaps` :
+            default 'iterative'
+    """
+
+    def __init__(self,
+                 df_spots,
+                 df_futures=None,
+                 df_swaps=None,
+                 spot_date=today,
+                 daycounter=Actual360,
+                 bump=1e-4,
+                 method='iterative'):
+
+        self.spot_date = spot_date
+        self.daycounter = daycounter
+        self.bump = bump
+
+        # The base curve after each stage is the starting point of the bumps
+        # of the next stage
+        self.__staged = _StagedCurve(df_spots, df_futures, df_swaps,
+                                     spot_date, daycounter, method)
+        self.pillars = self.__staged.pillars
+
+    @property
+    def curve(self):
+        """Returns a copy of the base discount curve"""
+        return copy.deepcopy(self.__staged.curve)
+
+    def discounts(self, dates):
+        """Returns the base discount factors at `dates`"""
+        curve = self.curve
+        curve.fit_terms(dates)
+        return curve.get(pd.DatetimeIndex(dates)).iloc[:, 0]
+
+    def bumped_discounts(self, dates):
+        """Returns the discount factors at `dates` (in columns) of the curve
+        bootstrapped with each input pillar bumped (in rows)"""
+        dates = pd.DatetimeIndex(dates)
+        base = self.discounts(dates).values
+        blocks = []
+        stages = self.__staged.stages
+        for i, (stage, rates) in enumerate(stages):
+            count = len(rates)
+            columns = range(count + 1)
+            shifts = np.zeros((count, count + 1))
+            shifts[:, 1:] = self.bump * np.eye(count)
+            bumped = pd.DataFrame(rates.values[:, np.newaxis] + shifts,
+                                  index=rates.index,
+                                  columns=columns)
+
+            curve = None
+            if i > 0:
+                curve = _widen(self.__staged.snapshots[i - 1], columns)
+            curve = self.__staged.apply(curve, stage, bumped)
+            for later, later_rates in stages[i + 1:]:
+                curve = self.__staged.apply(curve, later, pd.DataFrame(
+                    np.repeat(later_rates.values[:, np.newaxis],
+                              count + 1,
+                              axis=1),
+                    index=later_rates.index,
+                    columns=columns
+                ))
+
+            curve.fit_terms(dates)
+            values = curve.get(dates).values
+            # Shifts are measured against the unbumped column of the same
+            # run and applied to the base curve
+            blocks.append(base + (values[:, 1:] - values[:, [0]]).T)
+
+        return pd.DataFrame(np.vstack(blocks),
+                            index=self.pillars,
+                            columns=dates)
+
+    def dv01(self, cashflows, dates=None):
+        """Returns the change of value of each instrument (in rows) for the
+        bump of each input pillar (in columns)
+
+        Parameters
+        ==========
+            cashflows: pandas DataFrame with cashflow dates in columns and
+                       instruments in index or `CashflowMatrix`
+                The cashflows of the instruments
+
+            dates: list like of datetime
+                The cashflow dates when `cashflows` is an array or a sparse
+                matrix
+        """
+        matrix, dates, index = _cashflow_matrix(cashflows, dates)
+        base = matrix @ self.discounts(dates).values
+        bumped = matrix @ self.bumped_discounts(dates).values.T
+        return pd.DataFrame(np.asarray(bumped) - base[:, np.newaxis],
+                            index=index,
+                            columns=self.pillars)
+
+    def key_rate_durations(self, cashflows, dates=None):
+        """Returns the key rate durations of each instrument (in rows) with
+        respect to each input pillar (in columns)"""
+        matrix, dates, index = _cashflow_matrix(cashflows, dates)
+        base = matrix @ self.discounts(dates).values
+        dv01 = self.dv01(matrix, dates)
+        return -dv01.div(base * self.bump, axis=0).set_axis(index, axis=0)
+
+
+def _widen(curve, columns):
+    """Returns a copy of a single column curve repeated in `columns`"""
+    discounts = curve.term_structure
+    return DiscountCurve(
+        pd.DataFrame(np.repeat(discounts.values, len(columns), axis=1),
+                     index=discounts.index,
+                     columns=columns),
+        curve.spot_date,
+        curve.daycounter
+    )
+
+
+def _cashflow_matrix(cashflows, dates):
+    if isinstance(cashflows, CashflowMatrix):
+        matrix = cashflows.matrix
+        return matrix, cashflows.dates, pd.RangeIndex(matrix.shape[0])
+    if isinstance(cashflows, pd.DataFrame):
+        cashflows = cashflows.drop(columns='prices', errors='ignore')
+        return (cashflows.values,
+                pd.DatetimeIndex(cashflows.columns),
+                cashflows.index)
+    return (cashflows,
+            pd.DatetimeIndex(dates),
+            pd.RangeIndex(cashflows.shape[0]))
@@ -0,0 +1,322 @@
+"""
+Binary snapshots of built curves.
+
+Many curves are written to a single file that worker processes memory map
+and query without deserializing them. The file is columnar:
+
+    header      magic, version, number of curves, pillars, values and the
+                size of the metadata
+    metadata    JSON list with the key, curve type, spot date, day counter
+                and columns of each curve
+    offsets     int64 (curves + 1) first pillar of each curve
+    positions   int64 (curves + 1) first value of each curve
+    dates       float64 (pillars) proleptic Gregorian ordinals
+    fractions   float64 (pillars) year fractions from the spot date
+    values      float64 (values) pillars x columns of each curve, row major
+
+Every section starts on an 8 bytes boundary, so that the arrays of the
+reader are views of the mapped file.
+"""
+
+# pylint: disable=import-error
+
+import importlib
+import json
+import struct
+
+import numpy as np
+import pandas as pd
+
+from .api import (
+    DiscountCurve,
+    ForwardYieldCurve,
+    SpotYieldCurve,
+    SwapYieldCurve
+)
+from .interpolation import interpolate_terms
+
+MAGIC = b'RFCURVES'
+VERSION = 1
+
+_HEADER = struct.Struct('<8sIIQQQ')
+
+# Ordinal of 1970-01-01, the epoch of datetime64
+_EPOCH_ORDINAL = 719163
+
+_YIELD_CURVES = {
+    'Spot': SpotYieldCurve,
+    'Forward': ForwardYieldCurve,
+    'Swap': SwapYieldCurve
+}
+
+
+def save_curves(path, curves):
+    """Writes `curves` to the snapshot file `path`
+
+    Yield curves are saved with their discount curve, restored along with
+    them by `CurveSnapshot.curve`.
+
+    Parameters
+    ==========
+        path: str or path like
+            The snapshot file, overwritten if it exists
+
+        curves: dict or list of Curve
+            The curves by key, a list is keyed by position. Keys are stored
+            as JSON, tuples are read back as lists.
+    """
+    if not isinstance(curves, dict):
+        curves = dict(enumerate(curves))
+
+    entries = []
+    for key, curve in curves.items():
+        entries.append(_entry(key, curve))
+        discounts = getattr(curve, 'discounts', None)
+        if isinstance(discounts, DiscountCurve):
+            entries[-1][0]['discounts'] = len(entries)
+            entries.append(_entry(None, discounts))
+
+    metadata = [meta for meta, _ in entries]
+    frames = [frame for _, frame in entries]
+    counts = np.array([len(frame) for frame in frames], dtype=np.int64)
+    sizes = np.array([frame.size for frame in frames], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)]).astype('<i8')
+    positions = np.concatenate([[0], np.cumsum(sizes)]).astype('<i8')
+
+    dates = np.concatenate([
+        _ordinals(frame.index) for frame in frames
+    ] + [np.empty(0)]).astype('<f8')
+    fractions = np.concatenate([
+        _fractions(meta, frame.index) for meta, frame in entries
+    ] + [np.empty(0)]).astype('<f8')
+    values = np.concatenate([
+        frame.values.astype(np.float64).ravel() for frame in frames
+    ] + [np.empty(0)]).astype('<f8')
+
+    encoded = json.dumps(metadata).encode('utf-8')
+    encoded += b' ' * (-(_HEADER.size + len(encoded)) % 8)
+    with open(path, 'wb') as stream:
+        stream.write(_HEADER.pack(MAGIC, VERSION, len(frames), offsets[-1],
+                                  positions[-1], len(encoded)))
+        stream.write(encoded)
+        for array in (offsets, positions, dates, fractions, values):
+            stream.write(array.tobytes())
+
+
+def load_curves(path):
+    """Memory maps the snapshot file `path`, returns a `CurveSnapshot`"""
+    return CurveSnapshot(path)
+
+
+class CurveSnapshot:
+    """Curves of a snapshot file read through a read only memory map
+
+    The arrays of the curves are views of the file, shared by all the
+    processes mapping it. `pillars` and `get` read them in place, `curve`
+    rebuilds the curve object.
+
+    Parameters
+    ==========
+        path: str or path like
+            The snapshot file written by `save_curves`
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.__buffer = np.memmap(path, dtype=np.uint8, mode='r')
+
+        header = bytes(self.__buffer[:_HEADER.size])
+        magic, version, nb_curves, nb_pillars, nb_values, size = \
+            _HEADER.unpack(header)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a curve snapshot')
+        if version != VERSION:
+            raise ValueError(f'Unsupported curve snapshot version {version}')
+
+        start = _HEADER.size + size
+        self.__metadata = json.loads(
+            bytes(self.__buffer[_HEADER.size:start]).decode('utf-8')
+        )
+        self.offsets, start = self.__array(start, nb_curves + 1, '<i8')
+        self.positions, start = self.__array(start, nb_curves + 1, '<i8')
+        self.dates, start = self.__array(start, nb_pillars, '<f8')
+        self.fractions, start = self.__array(start, nb_pillars, '<f8')
+        self.values, _ = self.__array(start, nb_values, '<f8')
+
+        self.__entries = {
+            meta['key']: i
+            for i, meta in enumerate(self.__metadata)
+            if 'key' in meta
+        }
+
+    def __array(self, start, count, dtype):
+        end = start + 8 * count
+        return self.__buffer[start:end].view(dtype), end
+
+    def __len__(self):
+        return len(self.__entries)
+
+    def __contains__(self, key):
+        return _encode_key(key) in self.__entries
+
+    def keys(self):
+        """Returns the keys of the curves"""
+        return [_decode_key(key) for key in self.__entries]
+
+    def info(self, key):
+        """Returns the curve type, spot date, day counter and columns of the
+        curve `key`"""
+        meta = self.__metadata[self.__position(key)]
+        return {
+            'curve_type': meta['curve_type'],
+            'spot_date': pd.Timestamp(meta['spot_date']),
+            'daycounter': _daycounter(meta['daycounter']),
+            'columns': meta['columns']
+        }
+
+    def pillars(self, key):
+        """Returns the ordinal dates, the year fractions and the (pillars x
+        columns) values of the curve `key`, as views of the file"""
+        return self.__pillars(self.__position(key))
+
+    def frame(self, key):
+        """Returns the term structure of the curve `key` as a DataFrame"""
+        return self.__frame(self.__position(key))
+
+    def get(self, key, dates):
+        """Returns the values (dates x columns) of the curve `key` at `dates`
+
+        Pillar values are returned as stored. Discount factors are
+        interpolated linearly on the spot rates as `DiscountCurve.fit_terms`,
+        the rates of yield curves linearly, with flat extrapolation.
+        """
+        position = self.__position(key)
+        meta = self.__metadata[position]
+        ordinals, fractions, values = self.__pillars(position)
+
+        dates = pd.DatetimeIndex(np.atleast_1d(dates))
+        query = _ordinals(dates)
+        found = np.searchsorted(ordinals, query)
+        found = np.minimum(found, len(ordinals) - 1)
+        exact = ordinals[found] == query
+
+        result = np.empty((len(dates), values.shape[1]))
+        result[exact] = values[found[exact]]
+        if exact.all():
+            return result
+
+        terms = _fractions(meta, dates[~exact])
+        discount = meta['curve_type'] == 'Discount'
+        for i, column in enumerate(values.T):
+            if discount:
+                column = _to_spots(fractions, column)
+            valid = ~np.isnan(column)
+            xp, fp = fractions[valid], column[valid]
+            interpolated = interpolate_terms(xp, fp, terms)
+            if discount:
+                interpolated = _to_discounts(terms, interpolated)
+            result[~exact, i] = interpolated
+        return result
+
+    def curve(self, key):
+        """Rebuilds the curve `key` with its discount curve"""
+        return self.__curve(self.__position(key))
+
+    def __curve(self, position):
+        meta = self.__metadata[position]
+        frame = self.__frame(position)
+        spot_date = pd.Timestamp(meta['spot_date'])
+        daycounter = _daycounter(meta['daycounter'])
+        if meta['curve_type'] == 'Discount':
+            return DiscountCurve(frame, spot_date, daycounter)
+
+        cls = _YIELD_CURVES[meta['curve_type']]
+        discounts = None
+        if 'discounts' in meta:
+            discounts = self.__curve(meta['discounts'])
+        if cls is SpotYieldCurve:
+            curve = cls(frame, spot_date, daycounter)
+            if discounts is not None:
+                curve._discounts = discounts  # pylint: disable=W0212
+            return curve
+        return cls(frame, discounts, spot_date, daycounter)
+
+    def __position(self, key):
+        return self.__entries[_encode_key(key)]
+
+    def __pillars(self, position):
+        start, end = self.offsets[position:position + 2]
+        first, last = self.positions[position:position + 2]
+        values = self.values[first:last].reshape(end - start, -1)
+        return self.dates[start:end], self.fractions[start:end], values
+
+    def __frame(self, position):
+        ordinals, _, values = self.__pillars(position)
+        days = ordinals.astype(np.int64) - _EPOCH_ORDINAL
+        index = pd.DatetimeIndex(days.astype('datetime64[D]'))
+        columns = self.__metadata[position]['columns']
+        return pd.DataFrame(np.array(values), index=index, columns=columns)
+
+    def __repr__(self):
+        return f'CurveSnapshot({self.path!r}, {len(self)} curves)'
+
+
+def _entry(key, curve):
+    """Returns the metadata and the term structure of `curve`"""
+    frame = curve.term_structure.sort_index()
+    meta = {
+        'curve_type': curve.curve_type,
+        'spot_date': pd.Timestamp(curve.spot_date).isoformat(),
+        'daycounter': '{}:{}'.format(curve.daycounter.__module__,
+                                     curve.daycounter.__qualname__),
+        'columns': [_plain(column) for column in frame.columns]
+    }
+    if key is not None:
+        meta['key'] = _encode_key(key)
+    return meta, frame
+
+
+def _encode_key(key):
+    return json.dumps(_plain(key))
+
+
+def _decode_key(key):
+    return json.loads(key)
+
+
+def _plain(value):
+    """Converts numpy scalars to JSON serializable values"""
+    return value.item() if isinstance(value, np.generic) else value
+
+
+def _daycounter(name):
+    module, qualname = name.split(':')
+    return getattr(importlib.import_module(module), qualname)
+
+
+def _ordinals(dates):
+    days = pd.DatetimeIndex(dates).values.astype('datetime64[D]')
+    return days.astype(np.int64).astype(np.float64) + _EPOCH_ORDINAL
+
+
+def _fractions(meta, dates):
+    if len(dates) == 0:
+        return np.empty(0)
+    daycounter = _daycounter(meta['daycounter'])
+    fractions = daycounter(pd.Timestamp(meta['spot_date']),
+                           pd.DatetimeIndex(dates)).fraction()
+    return np.asarray(fractions, dtype=np.float64)
+
+
+def _to_spots(terms, discounts):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(terms <= 1,
+                        (1 / discounts - 1) / terms,
+                        (1 / discounts) ** (1 / terms) - 1)
+
+
+def _to_discounts(terms, spots):
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(terms <= 1,
+                        1 / (1 + spots * terms),
+                        1 / ((1 + spots) ** terms))
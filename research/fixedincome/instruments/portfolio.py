@@ -0,0 +1,125 @@
+"""
+Bond portfolio valuation module.
+
+The cash flow dates of all the bonds of a book are collected once on a
+shared grid of unique dates. A valuation evaluates the discount factors of
+the curve on the grid, without adding the dates to the curve, and sums the
+discounted cash flows bond by bond and date by date.
+"""
+
+# pylint: disable=import-error
+
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from research.fixedincome.cashflow.universe import (
+    CashFlowUniverse,
+    flatten_amounts
+)
+
+BookValuation = namedtuple('BookValuation', [
+    'present_values',  # dirty value of one unit of each bond
+    'exposures',       # discounted cash flows of the book at each date
+    'cash_flows',      # cash flows of the book at each date
+    'discounts'        # discount factors at each date
+])
+
+
+class BondPortfolio:
+    """Creates a book of bonds valued against discount curves
+
+    Parameters
+    ==========
+        amounts: FlatAmounts
+            The cash flows of the bonds, as returned by
+            `CashFlowUniverse.amounts`
+
+        quantities: float or list-like of float
+            The quantity held of each bond : default 1
+
+        index: list-like, optional
+            The name of each bond, their position by default
+    """
+
+    def __init__(self, amounts, quantities=1, index=None):
+        self.amounts = amounts
+        size = len(amounts.accrued)
+        self.quantities = np.broadcast_to(
+            np.asarray(quantities, dtype=np.float64), size
+        )
+        self.index = pd.RangeIndex(size) if index is None else \
+            pd.Index(index)
+
+        # Shared grid of the cash flow dates, each cash flow pointing to its
+        # date
+        dates, self.__positions = np.unique(amounts.dates,
+                                            return_inverse=True)
+        self.dates = pd.DatetimeIndex(dates)
+        self.__ids = np.repeat(np.arange(size), np.diff(amounts.offsets))
+        self.__cash = np.asarray(amounts.amounts, dtype=np.float64)
+        self.__book_cash = np.bincount(
+            self.__positions,
+            self.__cash * self.quantities[self.__ids],
+            len(self.dates)
+        )
+
+    @classmethod
+    def from_frames(cls, frames, quantities=1, index=None):
+        """Creates the book from the CASH_FLOW_MATRIX DataFrames returned by
+        `CashFlows.amounts`, one per bond"""
+        return cls(flatten_amounts(frames), quantities, index)
+
+    @classmethod
+    def from_bonds(cls, bonds, quantities=1, index=None):
+        """Creates the book of the `Bond` instances `bonds`, their cash flows
+        being computed by `CashFlowUniverse`"""
+        return cls(CashFlowUniverse.from_bonds(bonds).amounts(), quantities,
+                   index)
+
+    def __len__(self):
+        return len(self.index)
+
+    @property
+    def cash_flows(self):
+        """Returns the undiscounted cash flows of the book at each date"""
+        return pd.Series(self.__book_cash, index=self.dates)
+
+    def value(self, curve):
+        """Values the book against `curve`
+
+        The discount factors are read once on the shared grid of dates with
+        `curve.evaluate`, the curve is left unchanged. Each column of the
+        curve gives a column of the results.
+
+        Parameters
+        ==========
+            curve: DiscountCurve or YieldCurve
+                The curve discounting the cash flows
+
+        Returns the `BookValuation`: the present value of one unit of each
+        bond, the discounted cash flows of the book at each date, whose sum
+        is the value of the book, the cash flows of the book and the
+        discount factors at each date.
+        """
+        discounts = curve.evaluate(self.dates, kind='discount')
+        values = discounts.values
+        present_values = np.column_stack([
+            np.bincount(self.__ids,
+                        self.__cash * column[self.__positions],
+                        len(self))
+            for column in values.T
+        ])
+        return BookValuation(
+            present_values=pd.DataFrame(present_values,
+                                        index=self.index,
+                                        columns=discounts.columns),
+            exposures=discounts.mul(self.__book_cash, axis=0),
+            cash_flows=self.cash_flows,
+            discounts=discounts
+        )
+
+    def total_value(self, curve):
+        """Returns the value of the book against each column of `curve`"""
+        return self.value(curve).exposures.sum()
@@ -0,0 +1,201 @@
+"""
+Bond pricing module: prices, yields to maturity, durations and convexities
+of many bonds at once from their cash flow matrices.
+
+The yield y of a bond paying f coupons a year discounts each cash flow by
+(1 + y / f) ** -w, w being its year fraction counted in coupon periods as in
+the YEAR_FRACTIONS column of `CashFlows.amounts`. The first row of the cash
+flow matrix holds the accrued interest at the settlement with a negative
+sign, the dirty price is the clean price plus the accrued interest.
+"""
+
+# pylint: disable=import-error
+
+from collections import namedtuple
+
+import numpy as np
+
+from research.fixedincome.cashflow.universe import (
+    CashFlowUniverse,
+    flatten_amounts
+)
+
+BondMeasures = namedtuple('BondMeasures', [
+    'dirty_price',
+    'clean_price',
+    'accrued_interest',
+    'yield_to_maturity',
+    'macaulay_duration',
+    'modified_duration',
+    'convexity'
+])
+
+
+class BondPricer:
+    """Creates the pricer of a set of bonds
+
+    The cash flows of all the bonds are kept flat and every measure is a
+    segmented sum over them, the yields of all the bonds being solved by the
+    same Newton iterations.
+
+    Parameters
+    ==========
+        amounts: FlatAmounts
+            The cash flows of the bonds, as returned by
+            `CashFlowUniverse.amounts`
+
+        coupon_frequency: int or list-like of int
+            The number of coupons a year of each bond
+    """
+
+    def __init__(self, amounts, coupon_frequency=2):
+        self.amounts = amounts
+        size = len(amounts.accrued)
+        self.coupon_frequency = np.broadcast_to(
+            np.asarray(coupon_frequency, dtype=np.float64), size
+        )
+        self.__ids = np.repeat(np.arange(size), np.diff(amounts.offsets))
+        self.__cash = np.asarray(amounts.amounts, dtype=np.float64)
+        self.__periods = np.asarray(amounts.fractions, dtype=np.float64)
+
+    @classmethod
+    def from_frames(cls, frames, coupon_frequency=2):
+        """Creates the pricer from the CASH_FLOW_MATRIX DataFrames returned
+        by `CashFlows.amounts`, one per bond"""
+        return cls(flatten_amounts(frames), coupon_frequency)
+
+    @classmethod
+    def from_bonds(cls, bonds):
+        """Creates the pricer of the `Bond` instances `bonds`, their cash
+        flows being computed by `CashFlowUniverse`"""
+        cash_flows = CashFlowUniverse.from_bonds(bonds)
+        return cls(cash_flows.amounts(),
+                   cash_flows.schedules.coupon_frequency)
+
+    def __len__(self):
+        return len(self.amounts.accrued)
+
+    @property
+    def accrued_interest(self):
+        """Returns the accrued interest of each bond"""
+        return -np.asarray(self.amounts.accrued, dtype=np.float64)
+
+    def dirty_price(self, yields):
+        """Returns the dirty price of each bond at `yields`"""
+        return self.__sum(self.__discounts(yields))
+
+    def clean_price(self, yields):
+        """Returns the clean price of each bond at `yields`"""
+        return self.dirty_price(yields) - self.accrued_interest
+
+    def yield_to_maturity(self, prices, clean=True, tol=1e-12,
+                          max_iter=100):
+        """Solves the yield to maturity of each bond from its price
+
+        The dirty price is convex and decreasing in x = log(1 + y / f), the
+        Newton iterations on x of all the bonds thus converge from any
+        starting point. They start from the yield of a zero coupon bond
+        paying all the cash flows at maturity. The yields that did not
+        converge within `max_iter` iterations are NaN.
+
+        Parameters
+        ==========
+            prices: float or list-like of float
+                The price of each bond
+
+            clean: Boolean
+                Whether the prices are clean or dirty prices
+
+            tol: float
+                The tolerance on the change of x
+        """
+        prices = np.broadcast_to(np.asarray(prices, dtype=np.float64),
+                                 len(self))
+        if clean:
+            prices = prices + self.accrued_interest
+
+        # Start from the yield of a zero coupon paying the sum of the cash
+        # flows at the last one
+        ids, periods = self.__ids, self.__periods
+        last = np.zeros(len(self))
+        np.maximum.at(last, ids, periods)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            logs = np.log(self.__sum(np.ones(len(ids))) / prices) / last
+        logs = np.where(np.isfinite(logs), logs, 0.)
+
+        active = np.arange(len(self))
+        converged = np.zeros(len(self), dtype=bool)
+        for _ in range(max_iter):
+            selected = np.isin(ids, active)
+            rows = np.searchsorted(active, ids[selected])
+            discounted = self.__cash[selected] * np.exp(
+                -periods[selected] * logs[active][rows]
+            )
+            value = np.bincount(rows, discounted, len(active))
+            slope = -np.bincount(rows, periods[selected] * discounted,
+                                 len(active))
+            step = (value - prices[active]) / slope
+            logs[active] -= step
+
+            done = np.abs(step) < tol
+            converged[active[done]] = True
+            active = active[~done & np.isfinite(step)]
+            if not len(active):
+                break
+
+        yields = self.coupon_frequency * np.expm1(logs)
+        return np.where(converged, yields, np.nan)
+
+    def macaulay_duration(self, yields):
+        """Returns the Macaulay duration in years of each bond at
+        `yields`"""
+        discounted = self.__discounts(yields)
+        times = self.__periods / self.coupon_frequency[self.__ids]
+        return self.__sum(times * discounted) / self.__sum(discounted)
+
+    def modified_duration(self, yields):
+        """Returns the modified duration of each bond at `yields`: the
+        relative decrease of the dirty price for a unit increase of the
+        yield"""
+        yields = np.broadcast_to(np.asarray(yields, dtype=np.float64),
+                                 len(self))
+        return (self.macaulay_duration(yields)
+                / (1 + yields / self.coupon_frequency))
+
+    def convexity(self, yields):
+        """Returns the convexity of each bond at `yields`: the second
+        derivative of the dirty price with respect to the yield over the
+        dirty price"""
+        yields = np.broadcast_to(np.asarray(yields, dtype=np.float64),
+                                 len(self))
+        discounted = self.__discounts(yields)
+        periods = self.__periods
+        frequency = self.coupon_frequency
+        second = self.__sum(periods * (periods + 1) * discounted)
+        return second / self.__sum(discounted) / (
+            (frequency + yields) ** 2)
+
+    def measures(self, prices, clean=True):
+        """Returns the `BondMeasures` of each bond from its price"""
+        yields = self.yield_to_maturity(prices, clean)
+        dirty = self.dirty_price(yields)
+        return BondMeasures(
+            dirty_price=dirty,
+            clean_price=dirty - self.accrued_interest,
+            accrued_interest=self.accrued_interest,
+            yield_to_maturity=yields,
+            macaulay_duration=self.macaulay_duration(yields),
+            modified_duration=self.modified_duration(yields),
+            convexity=self.convexity(yields)
+        )
+
+    def __discounts(self, yields):
+        """Returns the discounted cash flows at `yields`"""
+        yields = np.broadcast_to(np.asarray(yields, dtype=np.float64),
+                                 len(self))
+        logs = np.log1p(yields / self.coupon_frequency)
+        return self.__cash * np.exp(-self.__periods * logs[self.__ids])
+
+    def __sum(self, values):
+        """Sums `values` of the cash flows bond by bond"""
+        return np.bincount(self.__ids, values, len(self))
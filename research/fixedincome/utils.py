@@ -10,21 +10,43 @@ from research.dates import utils as _ut
 
 
 def futures_reset(dates):
-    """Returns the reset date of futures with maturity date `dates`"""
-    return _ut.imm_date(_ut.roll(_ut.bom(dates), months=-3))
+    """Returns the reset date of futures with maturity date `dates`: the IMM
+    date (third Wednesday) of the third month before the maturity month
+    """
+    scalar = np.ndim(dates) == 0
+    months = _ut.as_date(np.atleast_1d(dates)).values.astype('datetime64[M]')
+    resets = _ut.as_date(_third_wednesdays(months - 3))
+    if scalar:
+        return resets[0]
+    return resets
 
 
 def futures_resets(futures_dates, spot_date):
     """Finds all the reset dates of the corresponding to `futures_dates` down
     to the last available spot rate `spot_date`
     """
-    dates = set()
-    for date in futures_dates:
-        while date > spot_date:
-            date = futures_reset(date)
-            dates.add(date)
-
-    return np.asarray(sorted(dates))
+    dates = _ut.as_date(futures_dates).values.astype('datetime64[D]')
+    spot = np.datetime64(_ut.as_date(spot_date).date(), 'D')
+    months = dates.astype('datetime64[M]')
+    count = (months.max() - spot.astype('datetime64[M]')).astype(np.int64)
+    count = max(int(count) // 3 + 2, 1)
+
+    # Each futures date resets every three months until the first reset
+    # falling before the spot date
+    chains = _third_wednesdays(
+        months[:, np.newaxis] - 3 * np.arange(1, count + 1)
+    )
+    previous = np.column_stack([dates, chains[:, :-1]])
+    resets = np.unique(chains[previous > spot])
+    return _ut.as_date(resets).astype(object).values
+
+
+def _third_wednesdays(months):
+    """Returns the third Wednesday of the datetime64[M] `months`"""
+    first_days = months.astype('datetime64[D]')
+    # 1970-01-01 is a Thursday, Monday being 0 and Wednesday 2
+    weekdays = (first_days.astype(np.int64) + 3) % 7
+    return first_days + (2 - weekdays) % 7 + 14
 
 
 def swap_cashflow_dates(swap_dates, spot_date, period=1):
@@ -44,6 +66,32 @@ def swap_cashflow_dates(swap_dates, spot_date, period=1):
     return dates
 
 
+def swap_cashflow_schedule(swap_dates, spot_date, period=1):
+    """Returns the cash flow dates of each swap of `swap_dates` in a flat
+    layout: the sorted dates of swap i are dates[offsets[i]:offsets[i+1]].
+    Each swap gets the same dates as `swap_cashflow_dates([date], spot_date,
+    period)`, generated for all the swaps at once.
+
+    Returns
+    =======
+        offsets: numpy array of int
+        dates: numpy array of datetime64[D]
+    """
+    step = int(12 / period)
+    maturities = _ut.as_date(swap_dates)
+    spot = np.datetime64(_ut.as_date(spot_date).date(), 'D')
+    months = (
+        maturities.values.astype('datetime64[M]').astype(np.int64)
+        - spot.astype('datetime64[M]').astype(np.int64)
+    )
+    periods = int(max(months.max(initial=0), 0) // step + 1)
+
+    chains = _ut.roll_months(maturities, -step, periods)[:, ::-1]
+    valid = chains >= spot
+    offsets = np.concatenate([[0], np.cumsum(valid.sum(axis=1))])
+    return offsets, chains[valid]
+
+
 def adjust_coupon_days(coupon_dates, ref):
     """Adjust coupon days"""
     mod = False